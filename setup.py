@@ -5,7 +5,8 @@ package_name = 'aqua_feeder'
 setup(
     name=package_name,
     version='1.0.0',
-    packages=find_packages(),
+    package_dir={'': 'src'},
+    packages=find_packages(where='src'),
     data_files=[
         ('share/ament_index/resource_index/packages',
             ['resource/' + package_name]),
@@ -35,6 +36,7 @@ setup(
             'control_node = aqua_feeder.control.control_node:main',
             'hardware_node = aqua_feeder.hardware.hardware_node:main',
             'main_controller = aqua_feeder.main_controller:main',
+            'aqua_feeder_compile = aqua_feeder.compile:main',
         ],
     },
 )
@@ -0,0 +1,52 @@
+"""
+JIT核心預編譯工具
+於安裝後或首次啟動前執行，預先編譯所有numba核心並寫入磁碟快取，
+避免裝置斷電重啟後在第一幀才付出編譯時間
+
+使用方式:
+    NUMBA_CACHE_DIR=/opt/aqua_feeder/numba_cache aqua_feeder_compile
+
+執行期需設定相同的 NUMBA_CACHE_DIR（指向持久化儲存）才能載入快取
+"""
+
+import importlib
+import logging
+import os
+import time
+
+from .utils.jit import NUMBA_AVAILABLE, warmup_kernels
+
+# 含有JIT核心的模組，匯入時會註冊各自的預熱函數
+KERNEL_MODULES = [
+    '.validation.system_validator',
+    '.vision.feature_extractor',
+    '.vision.image_processor',
+]
+
+
+def load_kernel_modules():
+    """匯入所有含JIT核心的模組"""
+    for module_name in KERNEL_MODULES:
+        importlib.import_module(module_name, package=__package__)
+
+
+def main():
+    """主函數 - 預編譯所有JIT核心"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+    
+    if not NUMBA_AVAILABLE:
+        logger.warning("未安裝numba，略過JIT預編譯")
+        return
+    
+    cache_dir = os.environ.get('NUMBA_CACHE_DIR')
+    logger.info(f"numba快取目錄: {cache_dir or '(預設: 模組__pycache__)'}")
+    
+    start_time = time.time()
+    load_kernel_modules()
+    count = warmup_kernels()
+    
+    logger.info(f"已預編譯 {count} 個JIT核心，耗時 {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    main()
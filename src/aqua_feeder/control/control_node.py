@@ -10,7 +10,6 @@
 import rclpy
 from rclpy.node import Node
 from std_msgs.msg import Float32MultiArray, Float32, String
-import yaml
 import os
 import time
 import csv
@@ -19,6 +18,7 @@ import logging
 from typing import Dict, Optional
 
 from .feeding_controller import FeedingController, FeedingState
+from ..utils.config_cache import load_yaml_config
 
 class ControlNode(Node):
     """
@@ -94,8 +94,7 @@ class ControlNode(Node):
             
             for path in config_paths:
                 if os.path.exists(path):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        config = yaml.safe_load(f)
+                    config = load_yaml_config(path)
                     self.logger.info(f"載入配置文件: {path}")
                     return config
             
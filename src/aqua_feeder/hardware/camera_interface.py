@@ -9,7 +9,7 @@ import threading
 import time
 import logging
 from typing import Optional, Tuple
-from queue import Queue
+from queue import Queue, Empty
 
 class CameraInterface:
     """相機接口類"""
@@ -381,12 +381,12 @@ class CameraInterface:
             Tuple[影像幀, 時間戳] 或 None
         """
         try:
-            if self.frame_queue.empty():
-                return None
-                
+            # 阻塞等待至多timeout秒，避免呼叫端在佇列為空時空轉
             frame, timestamp = self.frame_queue.get(timeout=timeout)
             return frame, timestamp
             
+        except Empty:
+            return None
         except Exception as e:
             self.logger.debug(f"獲取幀失敗: {e}")
             return None
@@ -6,12 +6,12 @@ ROS2硬體接口節點，處理PWM控制和GPIO操作
 import rclpy
 from rclpy.node import Node
 from std_msgs.msg import Float32, Float32MultiArray
-import yaml
 import os
 import logging
 
 from .pwm_controller import PWMController
 from .gpio_controller import GPIOController
+from ..utils.config_cache import load_yaml_config
 
 class HardwareNode(Node):
     """硬體接口節點"""
@@ -58,8 +58,7 @@ class HardwareNode(Node):
             
             for path in config_paths:
                 if os.path.exists(path):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        config = yaml.safe_load(f)
+                    config = load_yaml_config(path)
                     self.logger.info(f"載入配置文件: {path}")
                     return config
             
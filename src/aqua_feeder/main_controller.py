@@ -9,18 +9,32 @@ import threading
 import logging
 import csv
 import os
+import queue
 from datetime import datetime
 from typing import Dict, Optional
-import yaml
 import signal
-import sys
 import numpy as np
 
-from .vision.image_processor import ImageProcessor
-from .vision.feature_extractor import FeatureExtractor
+from .vision.image_processor import ImageProcessor, configure_opencl
+from .vision.feature_extractor import FeatureExtractor, Features
 from .control.feeding_controller import FeedingController, FeedingState
 from .hardware.camera_interface import CameraInterface
 from .hardware.pwm_controller import PWMController
+from .utils.jit import warmup_kernels
+from .utils.config_cache import load_yaml_config
+
+# 主迴圈取幀等待時間 (秒)
+FRAME_TIMEOUT = 0.1
+# 連續取幀失敗達此次數視為相機斷流
+STARVATION_MISSES = 30
+# 相機斷流期間的取幀等待時間 (秒)
+STARVATION_FRAME_TIMEOUT = 0.5
+# 狀態報告間隔 (奈秒)
+STATUS_INTERVAL_NS = 10_000_000_000
+# CSV寫入佇列容量，佇列滿時丟棄記錄而不阻塞主迴圈
+LOG_QUEUE_SIZE = 1024
+# CSV寫入執行緒單次批次寫入的最大筆數
+LOG_BATCH_SIZE = 128
 
 class AquaFeederController:
     """
@@ -45,10 +59,15 @@ class AquaFeederController:
         
         # 初始化各模塊
         self.camera = CameraInterface(self.config)
+        # OpenCV全域OpenCL開關於啟動時設定一次
+        configure_opencl(self.config)
         self.image_processor = ImageProcessor(self.config)
         self.feature_extractor = FeatureExtractor(self.config)
         self.feeding_controller = FeedingController(self.config)
         
+        # 預熱JIT核心（有磁碟快取時直接載入），避免第一幀付出編譯時間
+        warmup_kernels()
+        
         # 初始化硬體
         pwm_config = self.config.get('hardware', {}).get('pwm', {})
         self.pwm_controller = PWMController(
@@ -63,19 +82,22 @@ class AquaFeederController:
         self.stop_event = threading.Event()
         self.main_thread = None
         
-        # 資料記錄
-        self.csv_writer = None
-        self.csv_file = None
-        self.setup_data_logging()
-        
         # 統計信息
         self.stats = {
             'total_frames': 0,
             'total_feeding_cycles': 0,
             'avg_fps': 0.0,
+            'dropped_log_rows': 0,
             'start_time': time.time()
         }
         
+        # 資料記錄（由獨立執行緒寫入CSV，避免磁碟延遲影響控制迴圈）
+        self.csv_writer = None
+        self.csv_file = None
+        self._log_queue = None
+        self._log_thread = None
+        self.setup_data_logging()
+        
         # 註冊信號處理
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
@@ -97,8 +119,7 @@ class AquaFeederController:
     def _load_config(self, config_path: str) -> Dict:
         """載入配置文件"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml_config(config_path)
             self.logger.info(f"載入配置文件: {config_path}")
             return config
         except Exception as e:
@@ -147,6 +168,11 @@ class AquaFeederController:
             self.csv_writer = csv.DictWriter(self.csv_file, fieldnames=columns)
             self.csv_writer.writeheader()
             
+            # 啟動CSV寫入執行緒
+            self._log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            self._log_thread = threading.Thread(target=self._csv_writer_loop, daemon=True)
+            self._log_thread.start()
+            
             self.logger.info(f"資料記錄已啟用: {self.csv_file_path}")
             
         except Exception as e:
@@ -193,9 +219,16 @@ class AquaFeederController:
         self.camera.stop_capture()
         self.pwm_controller.stop()
         
-        # 關閉資料記錄
-        if self.csv_file:
-            self.csv_file.close()
+        # 關閉資料記錄：送出結束標記，等待寫入執行緒寫完剩餘記錄
+        # CSV檔案由寫入執行緒結束時自行關閉，逾時時不會在寫入中途被關閉
+        if self._log_thread and self._log_thread.is_alive():
+            self._send_log_sentinel()
+            self._log_thread.join(timeout=5.0)
+            if self._log_thread.is_alive():
+                self.logger.warning("CSV寫入執行緒未在時限內結束，檔案將於寫入完成後關閉")
+        
+        if self.stats['dropped_log_rows']:
+            self.logger.warning(f"CSV佇列已滿，共丟棄 {self.stats['dropped_log_rows']} 筆記錄")
         
         self.logger.info("系統已停止")
     
@@ -203,56 +236,80 @@ class AquaFeederController:
         """主控制迴圈"""
         self.logger.info("主控制迴圈啟動")
         
+        # 熱迴圈中使用的函數綁定為區域變數，減少屬性查找
+        monons = time.monotonic_ns
+        sleep = time.sleep
+        get_frame = self.camera.get_frame
+        get_fps = self.camera.get_fps
+        preprocess = self.image_processor.preprocess_image
+        extract = self.feature_extractor.extract_features
+        update_ctrl = self.feeding_controller.update
+        set_duty = self.pwm_controller.set_duty_cycle
+        stop_event = self.stop_event
+        
         fps_history = []
-        last_status_time = time.time()
+        last_status_ns = monons()
+        
+        # 相機斷流偵測：連續取幀失敗時拉長等待時間，減少空轉喚醒
+        misses = 0
+        frame_timeout = FRAME_TIMEOUT
         
-        while not self.stop_event.is_set():
+        while not stop_event.is_set():
             try:
-                loop_start_time = time.time()
+                loop_start_ns = monons()
                 
                 # 獲取影像幀
-                frame_data = self.camera.get_frame(timeout=0.1)
+                frame_data = get_frame(timeout=frame_timeout)
                 if frame_data is None:
+                    misses += 1
+                    if misses >= STARVATION_MISSES:
+                        self.logger.warning(f"相機無影像輸入，連續 {misses} 次取幀失敗")
+                        misses = 0
+                        frame_timeout = STARVATION_FRAME_TIMEOUT
                     continue
                 
+                misses = 0
+                frame_timeout = FRAME_TIMEOUT
                 frame, timestamp = frame_data
                 
                 # 影像處理
-                processed_image, rois = self.image_processor.preprocess_image(frame)
+                processed_image, rois = preprocess(frame)
                 
                 # 特徵提取
-                features = self.feature_extractor.extract_features(rois)
+                features = extract(rois)
                 
                 # 控制更新
-                current_fps = self.camera.get_fps()
-                new_pwm, current_state = self.feeding_controller.update(features, current_fps)
+                current_fps = get_fps()
+                new_pwm, current_state = update_ctrl(features, current_fps)
                 
                 # 更新PWM輸出
-                self.pwm_controller.set_duty_cycle(new_pwm)
+                set_duty(new_pwm)
                 
                 # 記錄資料
                 self._log_data(features, new_pwm, current_state, current_fps)
                 
                 # 更新統計
                 self.stats['total_frames'] += 1
-                fps_history.append(1.0 / (time.time() - loop_start_time))
+                loop_end_ns = monons()
+                dt_ns = loop_end_ns - loop_start_ns
+                fps_history.append(1e9 / dt_ns if dt_ns else 0.0)
                 if len(fps_history) > 30:  # 保持最近30幀的FPS
                     fps_history.pop(0)
                 
                 # 定期狀態報告
-                if time.time() - last_status_time > 10.0:  # 每10秒
+                if loop_end_ns - last_status_ns > STATUS_INTERVAL_NS:  # 每10秒
                     self._report_status(fps_history, features, new_pwm, current_state)
-                    last_status_time = time.time()
+                    last_status_ns = loop_end_ns
                 
             except Exception as e:
                 self.logger.error(f"主迴圈錯誤: {e}")
-                time.sleep(0.1)
+                sleep(0.1)
         
         self.logger.info("主控制迴圈結束")
     
-    def _log_data(self, features: Dict, pwm: float, state, fps: float):
-        """記錄資料到CSV"""
-        if not self.csv_writer:
+    def _log_data(self, features: Features, pwm: float, state, fps: float):
+        """將資料列放入CSV寫入佇列"""
+        if self._log_queue is None:
             return
         
         try:
@@ -264,19 +321,69 @@ class AquaFeederController:
                 'state': state.value if hasattr(state, 'value') else str(state),
                 'pwm': f"{pwm:.2f}",
                 'H': f"{H:.4f}",
-                'RSI': f"{features.get('RSI', 0):.4f}",
-                'POP': f"{features.get('POP', 0):.4f}",
-                'FLOW': f"{features.get('FLOW', 0):.4f}",
-                'ME_ring': f"{features.get('ME_ring', 0):.4f}",
+                'RSI': f"{features.RSI:.4f}",
+                'POP': f"{features.POP:.4f}",
+                'FLOW': f"{features.FLOW:.4f}",
+                'ME_ring': f"{features.ME_ring:.4f}",
                 'warnings': ""  # 可以添加警告信息
             }
             
-            self.csv_writer.writerow(row)
-            self.csv_file.flush()  # 確保資料寫入
+            # 不阻塞主迴圈，佇列滿時計數丟棄
+            self._log_queue.put_nowait(row)
             
+        except queue.Full:
+            self.stats['dropped_log_rows'] += 1
         except Exception as e:
             self.logger.error(f"資料記錄錯誤: {e}")
     
+    def _send_log_sentinel(self):
+        """
+        不阻塞地送出寫入結束標記
+        佇列已滿時丟棄最舊的一筆記錄騰出空間（計入丟棄數）後重試
+        """
+        while True:
+            try:
+                self._log_queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self._log_queue.get_nowait()
+                    self.stats['dropped_log_rows'] += 1
+                except queue.Empty:
+                    pass
+    
+    def _csv_writer_loop(self):
+        """CSV寫入迴圈，批次寫入佇列中的記錄直到收到結束標記None，結束時關閉檔案"""
+        try:
+            self._write_log_batches()
+        finally:
+            self.csv_file.close()
+    
+    def _write_log_batches(self):
+        """批次寫入佇列中的記錄直到收到結束標記None"""
+        log_queue = self._log_queue
+        running = True
+        
+        while running:
+            # 阻塞等待第一筆，再盡量取出已排隊的記錄一起寫入
+            batch = [log_queue.get()]
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if None in batch:
+                running = False
+                batch = [row for row in batch if row is not None]
+            
+            try:
+                if batch:
+                    self.csv_writer.writerows(batch)
+                    self.csv_file.flush()  # 確保資料寫入
+            except Exception as e:
+                self.logger.error(f"資料記錄寫入錯誤: {e}")
+    
     def _report_status(self, fps_history, features, pwm, state):
         """報告系統狀態"""
         avg_fps = sum(fps_history) / len(fps_history) if fps_history else 0
@@ -291,13 +398,12 @@ class AquaFeederController:
         self.logger.info(f"  當前狀態: {state.value if hasattr(state, 'value') else state}")
         self.logger.info(f"  PWM輸出: {pwm:.1f}%")
         self.logger.info(f"  活躍度H: {H:.3f}")
-        self.logger.info(f"  特徵值: RSI={features.get('RSI', 0):.3f}, POP={features.get('POP', 0):.3f}")
+        self.logger.info(f"  特徵值: RSI={features.RSI:.3f}, POP={features.POP:.3f}")
     
     def _signal_handler(self, signum, frame):
-        """信號處理函數"""
+        """信號處理函數（僅設定停止事件，實際關閉由main()執行）"""
         self.logger.info(f"收到信號 {signum}，正在關閉系統...")
-        self.stop()
-        sys.exit(0)
+        self.stop_event.set()
     
     def get_system_status(self) -> Dict:
         """獲取系統狀態"""
@@ -325,10 +431,9 @@ def main():
         
         print("智能餵料系統已啟動，按 Ctrl+C 停止...")
         
-        # 保持運行
+        # 保持運行，等待停止事件（由信號處理函數觸發）
         try:
-            while controller.is_running:
-                time.sleep(1)
+            controller.stop_event.wait()
         except KeyboardInterrupt:
             pass
         
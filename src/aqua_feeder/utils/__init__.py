@@ -0,0 +1,4 @@
+"""
+工具模塊
+包含JIT輔助、配置快取、系統監控等功能
+"""
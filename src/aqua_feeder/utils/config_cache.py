@@ -0,0 +1,45 @@
+"""
+配置文件載入工具
+同一行程內以LRU快取已解析的YAML，檔案未變更時不重複解析
+"""
+
+import copy
+import os
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import yaml
+
+# 有libyaml時使用C實作的SafeLoader，否則退回純Python版本
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# 已解析配置的LRU快取，鍵為 (絕對路徑, mtime奈秒, 檔案大小)
+_YAML_CACHE: "OrderedDict[Tuple[str, int, int], Dict]" = OrderedDict()
+_YAML_CACHE_SIZE = 32
+
+
+def load_yaml_config(config_path: str) -> Dict:
+    """
+    載入YAML配置文件
+    檔案的mtime與大小皆未變更時使用行程內快取，否則重新解析
+
+    Args:
+        config_path: YAML配置文件路徑
+
+    Returns:
+        配置字典（深拷貝，呼叫端修改不影響快取）
+    """
+    st = os.stat(config_path)
+    key = (os.path.abspath(config_path), st.st_mtime_ns, st.st_size)
+
+    config = _YAML_CACHE.get(key)
+    if config is not None:
+        _YAML_CACHE.move_to_end(key)
+    else:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.load(f, Loader=YAML_LOADER)
+        _YAML_CACHE[key] = config
+        if len(_YAML_CACHE) > _YAML_CACHE_SIZE:
+            _YAML_CACHE.popitem(last=False)
+
+    return copy.deepcopy(config)
@@ -0,0 +1,66 @@
+"""
+Numba JIT輔助工具
+提供可選的numba依賴處理及JIT核心預熱註冊機制
+"""
+
+import logging
+from typing import Callable, List
+
+try:
+    from numba import get_num_threads, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def get_num_threads():
+        """numba不可用時只有單一執行緒"""
+        return 1
+
+    def njit(*args, **kwargs):
+        """numba不可用時的替代裝飾器，直接返回原函數"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+logger = logging.getLogger(__name__)
+
+# 已註冊的預熱函數，每個函數以執行期相同的shape/dtype呼叫一次JIT核心
+_warmup_functions: List[Callable[[], None]] = []
+
+
+def register_warmup(func: Callable[[], None]) -> Callable[[], None]:
+    """
+    註冊JIT核心的預熱函數（可作為裝飾器使用）
+    
+    Args:
+        func: 無參數的預熱函數
+        
+    Returns:
+        原函數
+    """
+    _warmup_functions.append(func)
+    return func
+
+
+def warmup_kernels() -> int:
+    """
+    執行所有已註冊的預熱函數
+    搭配 @njit(cache=True) 時，編譯結果會寫入磁碟快取（NUMBA_CACHE_DIR），
+    之後啟動直接載入快取，不需重新編譯
+    
+    Returns:
+        成功預熱的核心數量
+    """
+    if not NUMBA_AVAILABLE:
+        return 0
+    
+    count = 0
+    for func in _warmup_functions:
+        try:
+            func()
+            count += 1
+        except Exception as e:
+            logger.warning(f"JIT核心預熱失敗 {func.__name__}: {e}")
+    
+    return count
@@ -4,13 +4,21 @@
 """
 
 import logging
+import os
 import time
 import json
 import psutil
 import threading
+from collections import deque
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+# Linux下直接讀取/proc，避免psutil逐項走訪檔案系統
+PROC_STAT = '/proc/stat'
+PROC_MEMINFO = '/proc/meminfo'
+PROC_NET_DEV = '/proc/net/dev'
+PROC_AVAILABLE = os.path.exists(PROC_STAT) and os.path.exists(PROC_MEMINFO)
+
 class SystemMonitor:
     """系統監控器類"""
     
@@ -29,18 +37,22 @@ class SystemMonitor:
         self.update_interval = monitor_config.get('update_interval', 5.0)
         self.history_size = monitor_config.get('history_size', 100)
         
-        # 狀態存儲
+        # 狀態存儲（固定長度佇列，超出時自動丟棄最舊記錄）
         self.system_stats = {}
-        self.status_history = []
-        self.alerts = []
+        self.status_history = deque(maxlen=self.history_size)
+        self.alerts = deque(maxlen=self.history_size)
+        self._last_health = None
         
-        # 閾值設定
-        self.thresholds = monitor_config.get('thresholds', {
+        # 閾值設定（複製一份，update_thresholds不會改動呼叫端的配置）
+        self.thresholds = dict(monitor_config.get('thresholds', {
             'cpu_usage': 80.0,
             'memory_usage': 85.0,
             'temperature': 70.0,
             'disk_usage': 90.0
-        })
+        }))
+        
+        # 上一次的CPU時間快照 (total, idle)，用於計算/proc/stat差值
+        self._prev_cpu_times = None
         
         # 監控線程
         self.monitoring_thread = None
@@ -72,16 +84,17 @@ class SystemMonitor:
         """監控主循環"""
         while self.is_monitoring:
             try:
+                # 每個監控週期只產生一次時間戳
+                ts = datetime.now().isoformat()
+                
                 # 收集系統統計
-                stats = self._collect_system_stats()
+                stats = self._collect_system_stats(ts)
                 
                 # 檢查閾值並生成警報
-                self._check_thresholds(stats)
+                self._check_thresholds(stats, ts)
                 
                 # 更新狀態
-                with self.lock:
-                    self.system_stats = stats
-                    self._update_history(stats)
+                self._update_history(stats)
                 
                 time.sleep(self.update_interval)
                 
@@ -89,20 +102,100 @@ class SystemMonitor:
                 self.logger.error(f"監控循環錯誤: {e}")
                 time.sleep(self.update_interval)
     
-    def _collect_system_stats(self) -> Dict[str, Any]:
-        """收集系統統計信息"""
+    def _collect_system_stats(self, ts: Optional[str] = None) -> Dict[str, Any]:
+        """
+        收集系統統計信息
+        
+        Args:
+            ts: 本週期的ISO時間戳，未提供時自行產生
+        """
+        if PROC_AVAILABLE:
+            try:
+                cpu_usage, memory, network = self._fast_collect_linux()
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                self.logger.debug(f"/proc讀取失敗，改用psutil: {e}")
+                cpu_usage, memory, network = self._collect_with_psutil()
+        else:
+            cpu_usage, memory, network = self._collect_with_psutil()
+        
         stats = {
-            'timestamp': datetime.now().isoformat(),
-            'cpu_usage': psutil.cpu_percent(interval=1),
-            'memory': self._get_memory_stats(),
+            'timestamp': ts or datetime.now().isoformat(),
+            'cpu_usage': cpu_usage,
+            'memory': memory,
             'disk': self._get_disk_stats(),
-            'network': self._get_network_stats(),
+            'network': network,
             'temperature': self._get_temperature(),
             'processes': self._get_process_count()
         }
         
         return stats
     
+    def _collect_with_psutil(self):
+        """透過psutil收集CPU、記憶體、網路統計（非Linux平台）"""
+        return (
+            psutil.cpu_percent(interval=1),
+            self._get_memory_stats(),
+            self._get_network_stats()
+        )
+    
+    def _fast_collect_linux(self):
+        """
+        直接解析/proc收集CPU、記憶體、網路統計
+        每個檔案僅開啟讀取一次，CPU使用率以相鄰兩次取樣的差值計算，
+        不需像psutil.cpu_percent(interval=1)阻塞1秒
+        
+        Returns:
+            (cpu_usage, memory, network)，格式與psutil路徑相同
+        """
+        # CPU: 第一行 "cpu user nice system idle iowait irq softirq steal ..."
+        with open(PROC_STAT, 'r') as f:
+            cpu_fields = [int(v) for v in f.readline().split()[1:9]]
+        total = sum(cpu_fields)
+        idle = cpu_fields[3] + cpu_fields[4]
+        
+        prev = self._prev_cpu_times
+        self._prev_cpu_times = (total, idle)
+        if prev is not None and total > prev[0]:
+            busy = (total - prev[0]) - (idle - prev[1])
+            cpu_usage = busy / (total - prev[0]) * 100.0
+        else:
+            # 首次取樣使用開機以來的平均值
+            cpu_usage = (total - idle) / total * 100.0 if total else 0.0
+        
+        # 記憶體: 單位為kB
+        meminfo = {}
+        with open(PROC_MEMINFO, 'r') as f:
+            for line in f:
+                key, value = line.split(':', 1)
+                meminfo[key] = int(value.split()[0]) * 1024
+        mem_total = meminfo['MemTotal']
+        mem_available = meminfo.get('MemAvailable', meminfo['MemFree'])
+        mem_used = mem_total - mem_available
+        memory = {
+            'total': mem_total / (1024**3),  # GB
+            'available': mem_available / (1024**3),
+            'used': mem_used / (1024**3),
+            'percent': mem_used / mem_total * 100
+        }
+        
+        # 網路: 加總所有介面，前兩行為表頭
+        bytes_recv = packets_recv = bytes_sent = packets_sent = 0
+        with open(PROC_NET_DEV, 'r') as f:
+            for line in f.readlines()[2:]:
+                fields = line.split(':', 1)[1].split()
+                bytes_recv += int(fields[0])
+                packets_recv += int(fields[1])
+                bytes_sent += int(fields[8])
+                packets_sent += int(fields[9])
+        network = {
+            'bytes_sent': bytes_sent,
+            'bytes_recv': bytes_recv,
+            'packets_sent': packets_sent,
+            'packets_recv': packets_recv
+        }
+        
+        return cpu_usage, memory, network
+    
     def _get_memory_stats(self) -> Dict[str, float]:
         """獲取記憶體統計"""
         memory = psutil.virtual_memory()
@@ -157,49 +250,86 @@ class SystemMonitor:
         """獲取進程數量"""
         return len(psutil.pids())
     
-    def _check_thresholds(self, stats: Dict[str, Any]):
-        """檢查閾值並生成警報"""
-        current_time = datetime.now()
+    def _check_thresholds(self, stats: Dict[str, Any], ts: Optional[str] = None):
+        """
+        檢查閾值並生成警報
+        同時快取健康評估結果，供get_system_health直接讀取
+        """
+        for alert_type, message in self._evaluate_health(stats, ts):
+            self._add_alert(alert_type, message, ts)
+    
+    def _evaluate_health(self, stats: Dict[str, Any], ts: Optional[str] = None) -> List[tuple]:
+        """
+        單次遍歷計算健康評分並更新快取
+        
+        Returns:
+            超出閾值的 (警報類型, 訊息) 列表
+        """
+        health_score = 100
+        issues = []
         
         # CPU使用率檢查
-        if stats['cpu_usage'] > self.thresholds['cpu_usage']:
-            self._add_alert('high_cpu', f"CPU使用率過高: {stats['cpu_usage']:.1f}%")
+        cpu_usage = stats.get('cpu_usage', 0)
+        if cpu_usage > self.thresholds['cpu_usage']:
+            health_score -= 20
+            issues.append(('high_cpu', f"CPU使用率過高: {cpu_usage:.1f}%"))
         
         # 記憶體使用率檢查
-        if stats['memory']['percent'] > self.thresholds['memory_usage']:
-            self._add_alert('high_memory', f"記憶體使用率過高: {stats['memory']['percent']:.1f}%")
+        memory_usage = stats.get('memory', {}).get('percent', 0)
+        if memory_usage > self.thresholds['memory_usage']:
+            health_score -= 25
+            issues.append(('high_memory', f"記憶體使用率過高: {memory_usage:.1f}%"))
         
         # 磁碟使用率檢查
-        if stats['disk']['percent'] > self.thresholds['disk_usage']:
-            self._add_alert('high_disk', f"磁碟使用率過高: {stats['disk']['percent']:.1f}%")
+        disk_usage = stats.get('disk', {}).get('percent', 0)
+        if disk_usage > self.thresholds['disk_usage']:
+            health_score -= 15
+            issues.append(('high_disk', f"磁碟使用率過高: {disk_usage:.1f}%"))
         
         # 溫度檢查
-        if stats['temperature'] and stats['temperature'] > self.thresholds['temperature']:
-            self._add_alert('high_temperature', f"溫度過高: {stats['temperature']:.1f}°C")
+        temperature = stats.get('temperature')
+        if temperature and temperature > self.thresholds['temperature']:
+            health_score -= 30
+            issues.append(('high_temperature', f"溫度過高: {temperature:.1f}°C"))
+        
+        # 確定健康狀態
+        if health_score >= 80:
+            status = 'healthy'
+        elif health_score >= 60:
+            status = 'warning'
+        else:
+            status = 'critical'
+        
+        with self.lock:
+            self._last_health = {
+                'status': status,
+                'score': max(0, health_score),
+                'issues': [message for _, message in issues],
+                'timestamp': stats.get('timestamp', ts)
+            }
+        
+        return issues
     
-    def _add_alert(self, alert_type: str, message: str):
+    def _add_alert(self, alert_type: str, message: str, ts: Optional[str] = None):
         """添加警報"""
         alert = {
             'type': alert_type,
             'message': message,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': ts or datetime.now().isoformat(),
             'severity': 'warning'
         }
         
+        # 鎖內僅做O(1)追加，日誌輸出在鎖外進行
         with self.lock:
             self.alerts.append(alert)
-            # 限制警報歷史大小
-            if len(self.alerts) > self.history_size:
-                self.alerts = self.alerts[-self.history_size:]
         
         self.logger.warning(f"系統警報: {message}")
     
     def _update_history(self, stats: Dict[str, Any]):
-        """更新狀態歷史"""
-        self.status_history.append(stats)
-        # 限制歷史大小
-        if len(self.status_history) > self.history_size:
-            self.status_history = self.status_history[-self.history_size:]
+        """更新當前狀態及狀態歷史"""
+        with self.lock:
+            self.system_stats = stats
+            self.status_history.append(stats)
     
     def get_current_status(self) -> Dict[str, Any]:
         """獲取當前系統狀態"""
@@ -217,7 +347,7 @@ class SystemMonitor:
             狀態歷史列表
         """
         with self.lock:
-            history = self.status_history.copy()
+            history = list(self.status_history)
             if limit:
                 return history[-limit:]
             return history
@@ -233,7 +363,7 @@ class SystemMonitor:
             警報列表
         """
         with self.lock:
-            alerts = self.alerts.copy()
+            alerts = list(self.alerts)
             if limit:
                 return alerts[-limit:]
             return alerts
@@ -247,56 +377,20 @@ class SystemMonitor:
     def get_system_health(self) -> Dict[str, Any]:
         """
         獲取系統健康狀態
+        直接返回最近一次閾值檢查的快取結果
         
         Returns:
             健康狀態報告
         """
-        stats = self.get_current_status()
-        if not stats:
-            return {'status': 'unknown', 'details': '無法獲取系統統計'}
-        
-        # 評估健康狀態
-        health_score = 100
-        issues = []
-        
-        # CPU檢查
-        if stats.get('cpu_usage', 0) > self.thresholds['cpu_usage']:
-            health_score -= 20
-            issues.append(f"CPU使用率過高: {stats['cpu_usage']:.1f}%")
-        
-        # 記憶體檢查
-        memory_usage = stats.get('memory', {}).get('percent', 0)
-        if memory_usage > self.thresholds['memory_usage']:
-            health_score -= 25
-            issues.append(f"記憶體使用率過高: {memory_usage:.1f}%")
-        
-        # 磁碟檢查
-        disk_usage = stats.get('disk', {}).get('percent', 0)
-        if disk_usage > self.thresholds['disk_usage']:
-            health_score -= 15
-            issues.append(f"磁碟使用率過高: {disk_usage:.1f}%")
-        
-        # 溫度檢查
-        temperature = stats.get('temperature')
-        if temperature and temperature > self.thresholds['temperature']:
-            health_score -= 30
-            issues.append(f"溫度過高: {temperature:.1f}°C")
-        
-        # 確定健康狀態
-        if health_score >= 80:
-            status = 'healthy'
-        elif health_score >= 60:
-            status = 'warning'
-        else:
-            status = 'critical'
+        with self.lock:
+            if not self.system_stats or self._last_health is None:
+                return {'status': 'unknown', 'details': '無法獲取系統統計'}
+            
+            health = dict(self._last_health)
+            health['issues'] = list(health['issues'])
+            health['stats'] = dict(self.system_stats)
         
-        return {
-            'status': status,
-            'score': max(0, health_score),
-            'issues': issues,
-            'timestamp': datetime.now().isoformat(),
-            'stats': stats
-        }
+        return health
     
     def export_data(self, filename: str):
         """
@@ -335,6 +429,11 @@ class SystemMonitor:
         """
         self.thresholds.update(new_thresholds)
         self.logger.info(f"閾值已更新: {new_thresholds}")
+        
+        # 以新閾值重新評估當前狀態，避免快取的健康狀態過期
+        stats = self.get_current_status()
+        if stats:
+            self._evaluate_health(stats)
     
     def __del__(self):
         """析構函數"""
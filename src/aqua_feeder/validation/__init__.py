@@ -0,0 +1,4 @@
+"""
+驗證模塊
+包含系統日誌分析與驗證報告生成
+"""
@@ -9,14 +9,346 @@
 
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # 僅輸出圖檔，不需互動式後端
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 import os
 import logging
-from typing import Dict, List, Tuple, Optional
-from scipy import stats
-import yaml
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional, Union
+from scipy import special
+
+from ..utils.jit import njit, register_warmup
+from ..utils.config_cache import load_yaml_config
+
+# 可用時以PyArrow多執行緒解析CSV
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 已解析日誌的LRU快取，鍵為 (絕對路徑, mtime, 檔案大小)
+_CSV_CACHE: "OrderedDict[Tuple[str, float, int], pd.DataFrame]" = OrderedDict()
+_CSV_CACHE_SIZE = 4
+
+# 日誌中以float32保存的數值欄位
+_FLOAT32_COLUMNS = ('H', 'pwm')
+
+# 超過此大小的日誌改以分段串流驗證，避免整份載入記憶體
+_STREAMING_THRESHOLD_BYTES = 64 * 1024 * 1024
+_STREAM_CHUNK_ROWS = 50_000
+
+# 串流模式下圖表最多繪製的資料點數（等間隔抽樣）
+_PLOT_MAX_POINTS = 20_000
+
+# pandas 2.0起可指定ISO8601格式，跳過逐筆格式推斷
+_ISO8601_KWARGS = {'format': 'ISO8601'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """
+    將時間戳欄位轉為datetime，已轉換過則直接返回
+    
+    Args:
+        values: 時間戳欄位
+        
+    Returns:
+        datetime欄位
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, **_ISO8601_KWARGS)
+
+def _state_mask(states: pd.Series, state: str) -> np.ndarray:
+    """
+    狀態欄位等於指定狀態的布林遮罩
+    類別欄位直接比較整數代碼，不逐筆比較字串
+    
+    Args:
+        states: 狀態欄位
+        state: 狀態名稱
+        
+    Returns:
+        布林陣列
+    """
+    if isinstance(states.dtype, pd.CategoricalDtype):
+        categories = states.cat.categories
+        if state not in categories:
+            return np.zeros(len(states), dtype=bool)
+        return states.cat.codes.to_numpy() == categories.get_loc(state)
+    return states.to_numpy() == state
+
+@njit(cache=True, fastmath=True)
+def _pearsonr(x, y):
+    """
+    計算Pearson相關係數（兩次遍歷：均值、再累加中心化乘積）
+    
+    Args:
+        x, y: 等長float64一維陣列
+        
+    Returns:
+        相關係數r，任一序列為常數時返回nan
+    """
+    n = x.shape[0]
+    mx = 0.0
+    my = 0.0
+    for i in range(n):
+        mx += x[i]
+        my += y[i]
+    mx /= n
+    my /= n
+    
+    sxx = 0.0
+    syy = 0.0
+    sxy = 0.0
+    for i in range(n):
+        dx = x[i] - mx
+        dy = y[i] - my
+        sxx += dx * dx
+        syy += dy * dy
+        sxy += dx * dy
+    
+    if sxx == 0.0 or syy == 0.0:
+        return np.nan
+    r = sxy / np.sqrt(sxx * syy)
+    return max(-1.0, min(1.0, r))
+
+@register_warmup
+def _warmup_pearsonr():
+    """預熱相關係數核心"""
+    sample = np.arange(3, dtype=np.float64)
+    _pearsonr(sample, sample)
+
+def pearsonr(x, y) -> Tuple[float, float]:
+    """
+    Pearson相關係數及雙尾p值
+    
+    Args:
+        x, y: 等長數列
+        
+    Returns:
+        (相關係數, p值)
+    """
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    n = x.shape[0]
+    if n < 2 or y.shape[0] != n:
+        raise ValueError("pearsonr需要兩個長度相同且至少2筆的數列")
+    
+    r = float(_pearsonr(x, y))
+    return r, _pearson_pvalue(r, n)
+
+def _pearson_pvalue(r: float, n: int) -> float:
+    """
+    相關係數的雙尾p值（t分佈檢定）
+    
+    Args:
+        r: 相關係數
+        n: 樣本數
+        
+    Returns:
+        p值
+    """
+    if np.isnan(r) or n < 3:
+        return np.nan
+    if abs(r) >= 1.0:
+        return 0.0
+    
+    dof = n - 2
+    t = r * np.sqrt(dof / (1.0 - r * r))
+    return float(2.0 * special.stdtr(dof, -abs(t)))
+
+def _count_csv_rows(csv_file: str) -> int:
+    """
+    以區塊掃描換行符計算CSV資料列數（不含標題列），不解析內容
+    
+    Args:
+        csv_file: CSV文件路徑
+        
+    Returns:
+        資料列數
+    """
+    lines = 0
+    last = b'\n'
+    with open(csv_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(0, lines - 1)
+
+def _iter_log_chunks(csv_file: str, columns: List[str], chunk_rows: int,
+                     row_bytes: float):
+    """
+    分段讀取日誌CSV
+    
+    Args:
+        csv_file: 日誌CSV文件路徑
+        columns: 需要的欄位
+        chunk_rows: 每段列數
+        row_bytes: 平均每列位元組數（換算PyArrow區塊大小）
+        
+    Yields:
+        每段的DataFrame
+    """
+    if PYARROW_AVAILABLE:
+        column_types = {column: pa.float64() for column in _FLOAT32_COLUMNS if column in columns}
+        column_types.update({column: pa.string() for column in ('timestamp', 'state') if column in columns})
+        reader = pa_csv.open_csv(
+            csv_file,
+            read_options=pa_csv.ReadOptions(block_size=max(1 << 12, int(chunk_rows * row_bytes))),
+            convert_options=pa_csv.ConvertOptions(include_columns=columns, column_types=column_types)
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(csv_file, usecols=columns, chunksize=chunk_rows)
+
+class _CorrelationStream:
+    """Pearson相關係數的分段累加器（以Chan合併公式累加均值與共變異）"""
+    
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+    
+    def update(self, x: np.ndarray, y: np.ndarray):
+        """累加一段資料"""
+        n_b = len(x)
+        if n_b == 0:
+            return
+        mean_x_b = x.mean()
+        mean_y_b = y.mean()
+        dx = x - mean_x_b
+        dy = y - mean_y_b
+        
+        n = self.n + n_b
+        delta_x = mean_x_b - self.mean_x
+        delta_y = mean_y_b - self.mean_y
+        weight = self.n * n_b / n
+        self.m2_x += dx @ dx + delta_x * delta_x * weight
+        self.m2_y += dy @ dy + delta_y * delta_y * weight
+        self.c_xy += dx @ dy + delta_x * delta_y * weight
+        self.mean_x += delta_x * n_b / n
+        self.mean_y += delta_y * n_b / n
+        self.n = n
+    
+    def result(self) -> Tuple[float, float]:
+        """
+        Returns:
+            (相關係數, p值)
+        """
+        if self.n < 2 or self.m2_x == 0.0 or self.m2_y == 0.0:
+            return np.nan, np.nan
+        r = self.c_xy / np.sqrt(self.m2_x * self.m2_y)
+        r = float(max(-1.0, min(1.0, r))) if not np.isnan(r) else np.nan
+        return r, _pearson_pvalue(r, self.n)
+
+class _OscillationStream:
+    """滑動窗口振盪幅度（max-min）的分段累加器，跨段保留前段末尾 W-1 筆"""
+    
+    def __init__(self, time_window: int):
+        self.time_window = time_window
+        self.tail = np.empty(0, dtype=np.float64)
+        self.num_values = 0
+        self.num_windows = 0
+        self.max_oscillation = 0.0
+        self.sum_oscillation = 0.0
+    
+    def update(self, values: np.ndarray):
+        """累加一段PWM值（NaN會被略過）"""
+        values = values[~np.isnan(values)]
+        self.num_values += len(values)
+        data = np.concatenate([self.tail, values])
+        
+        if len(data) >= self.time_window:
+            windows = np.lib.stride_tricks.sliding_window_view(data, self.time_window)
+            oscillations = windows.max(axis=1) - windows.min(axis=1)
+            if self.num_windows == 0:
+                self.max_oscillation = float(oscillations.max())
+            else:
+                self.max_oscillation = max(self.max_oscillation, float(oscillations.max()))
+            self.sum_oscillation += float(oscillations.sum())
+            self.num_windows += len(oscillations)
+        
+        self.tail = data[-(self.time_window - 1):] if self.time_window > 1 else data[:0]
+
+class _TransitionStream:
+    """進入指定狀態的轉換耗時累加器，跨段保留前段最後一筆"""
+    
+    def __init__(self):
+        self.prev_flag = np.zeros(0, dtype=bool)
+        self.prev_time = np.zeros(0, dtype='datetime64[ns]')
+        self.parts = []
+    
+    def update(self, flags: np.ndarray, timestamps: np.ndarray):
+        """累加一段狀態遮罩與時間戳"""
+        if len(flags) == 0:
+            return
+        flags_ext = np.concatenate([self.prev_flag, flags])
+        times_ext = np.concatenate([self.prev_time, timestamps])
+        transitions = flags_ext[1:] & ~flags_ext[:-1]
+        self.parts.append(
+            (times_ext[1:][transitions] - times_ext[:-1][transitions]) / np.timedelta64(1, 's')
+        )
+        self.prev_flag = flags[-1:].copy()
+        self.prev_time = timestamps[-1:].copy()
+    
+    def result(self) -> np.ndarray:
+        """所有轉換耗時（秒）"""
+        return np.concatenate(self.parts) if self.parts else np.empty(0)
+
+class _FeedingCycleStream:
+    """
+    餵食週期耗時累加器
+    週期起點為空閒時的第一筆「餵食中」，終點為其後第一筆「穩定等待」；
+    跨段未結束的週期保留其起點時間
+    """
+    
+    def __init__(self):
+        self.pending_start = None
+        self.parts = []
+    
+    def update(self, feeding: np.ndarray, settled: np.ndarray, timestamps: np.ndarray):
+        """累加一段狀態遮罩與時間戳"""
+        feed_idx = np.flatnonzero(feeding)
+        settle_idx = np.flatnonzero(settled)
+        
+        pos = 0
+        if self.pending_start is not None:
+            if len(settle_idx) == 0:
+                return
+            end = settle_idx[0]
+            self.parts.append(np.array([(timestamps[end] - self.pending_start) / np.timedelta64(1, 's')]))
+            self.pending_start = None
+            pos = end + 1
+        
+        starts, ends = [], []
+        while True:
+            i = np.searchsorted(feed_idx, pos)
+            if i == len(feed_idx):
+                break
+            j = np.searchsorted(settle_idx, feed_idx[i], side='right')
+            if j == len(settle_idx):
+                self.pending_start = timestamps[feed_idx[i]]
+                break
+            starts.append(feed_idx[i])
+            ends.append(settle_idx[j])
+            pos = settle_idx[j] + 1
+        
+        if starts:
+            self.parts.append((timestamps[ends] - timestamps[starts]) / np.timedelta64(1, 's'))
+    
+    def result(self) -> np.ndarray:
+        """所有完整週期耗時（秒）"""
+        return np.concatenate(self.parts) if self.parts else np.empty(0)
 
 class SystemValidator:
     """
@@ -45,25 +377,67 @@ class SystemValidator:
             'hit_rate_target': validation_config.get('hit_rate_target', 0.70)
         }
         
+        # 驗證圖表（首次生成時建立，之後各報告重複使用）
+        self._fig = None
+        self._axes = None
+        
         self.logger.info("系統驗證器初始化完成")
         self.logger.info(f"驗證目標: {self.targets}")
     
     def _load_config(self, config_path: str) -> Dict:
-        """載入配置文件"""
+        """載入配置文件（檔案未變更時使用快取，返回深拷貝）"""
         try:
-            with open(config_path, 'r', encoding='utf-8') as file:
-                return yaml.safe_load(file)
+            return load_yaml_config(config_path)
         except Exception as e:
             self.logger.error(f"載入配置失敗: {e}")
             return {}
     
-    def validate_correlation(self, csv_file: str, airflow_data: Optional[List[float]] = None) -> Dict:
+    def _read_log(self, csv_file: Union[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        讀取日誌CSV（檔案未變更時使用快取）
+        
+        Args:
+            csv_file: 日誌CSV文件路徑，或已解析的DataFrame
+            
+        Returns:
+            日誌DataFrame（淺拷貝，新增或替換欄位不影響快取）
+        """
+        if isinstance(csv_file, pd.DataFrame):
+            return csv_file.copy(deep=False)
+        
+        st = os.stat(csv_file)
+        key = (os.path.abspath(csv_file), st.st_mtime, st.st_size)
+        
+        df = _CSV_CACHE.get(key)
+        if df is not None:
+            _CSV_CACHE.move_to_end(key)
+        else:
+            if PYARROW_AVAILABLE:
+                df = pd.read_csv(csv_file, engine='pyarrow')
+            else:
+                df = pd.read_csv(csv_file)
+            
+            if 'timestamp' in df.columns:
+                df['timestamp'] = _to_datetime(df['timestamp'])
+            if 'state' in df.columns:
+                df['state'] = df['state'].astype('category')
+            for column in _FLOAT32_COLUMNS:
+                if column in df.columns:
+                    df[column] = pd.to_numeric(df[column], errors='coerce').astype(np.float32)
+            
+            _CSV_CACHE[key] = df
+            if len(_CSV_CACHE) > _CSV_CACHE_SIZE:
+                _CSV_CACHE.popitem(last=False)
+        
+        return df.copy(deep=False)
+    
+    def validate_correlation(self, csv_file: Union[str, pd.DataFrame], airflow_data: Optional[List[float]] = None) -> Dict:
         """
         驗證活躍度H與氣泡盤檔位的相關係數
         目標：r(airflow, H) ≥ 0.75
         
         Args:
-            csv_file: 日誌CSV文件路徑
+            csv_file: 日誌CSV文件路徑或已解析的DataFrame
             airflow_data: 氣泡盤檔位數據（可選，用於展示缸測試）
             
         Returns:
@@ -71,7 +445,7 @@ class SystemValidator:
         """
         try:
             # 讀取數據
-            df = pd.read_csv(csv_file)
+            df = self._read_log(csv_file)
             
             if 'H' not in df.columns:
                 return {'status': 'error', 'message': '缺少H值數據'}
@@ -85,36 +459,21 @@ class SystemValidator:
                 return {'status': 'error', 'message': 'airflow數據長度不匹配'}
             
             # 計算相關係數
-            correlation, p_value = stats.pearsonr(airflow_data, df['H'])
-            
-            # 驗證結果
-            is_passed = correlation >= self.targets['correlation_target']
-            
-            result = {
-                'status': 'passed' if is_passed else 'failed',
-                'correlation_coefficient': correlation,
-                'p_value': p_value,
-                'target': self.targets['correlation_target'],
-                'is_significant': p_value < 0.05,
-                'sample_size': len(df),
-                'timestamp': datetime.now().isoformat()
-            }
+            correlation, p_value = pearsonr(airflow_data, df['H'].to_numpy(np.float64))
             
-            self.logger.info(f"相關係數驗證: r={correlation:.3f}, 目標≥{self.targets['correlation_target']}")
-            
-            return result
+            return self._correlation_result(correlation, p_value, len(df))
             
         except Exception as e:
             self.logger.error(f"相關係數驗證失敗: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def validate_pwm_oscillation(self, csv_file: str, time_window: int = 10) -> Dict:
+    def validate_pwm_oscillation(self, csv_file: Union[str, pd.DataFrame], time_window: int = 10) -> Dict:
         """
         驗證PWM振盪幅度
         目標：PWM振盪幅度 ≤ ±15%（10迴合內）
         
         Args:
-            csv_file: 日誌CSV文件路徑
+            csv_file: 日誌CSV文件路徑或已解析的DataFrame
             time_window: 分析時間窗口（迴合數）
             
         Returns:
@@ -122,122 +481,161 @@ class SystemValidator:
         """
         try:
             # 讀取數據
-            df = pd.read_csv(csv_file)
+            df = self._read_log(csv_file)
             
             if 'pwm' not in df.columns:
                 return {'status': 'error', 'message': '缺少PWM數據'}
             
-            # 轉換PWM為數值
-            df['pwm_numeric'] = pd.to_numeric(df['pwm'], errors='coerce')
-            df = df.dropna(subset=['pwm_numeric'])
-            
-            if len(df) < time_window:
-                return {'status': 'error', 'message': f'數據不足，需要至少{time_window}個數據點'}
-            
-            # 計算滑動窗口內的振盪幅度
-            oscillations = []
-            for i in range(len(df) - time_window + 1):
-                window_data = df['pwm_numeric'].iloc[i:i+time_window]
-                max_val = window_data.max()
-                min_val = window_data.min()
-                oscillation = max_val - min_val
-                oscillations.append(oscillation)
-            
-            max_oscillation = max(oscillations) if oscillations else 0
-            avg_oscillation = np.mean(oscillations) if oscillations else 0
-            
-            # 驗證結果
-            is_passed = max_oscillation <= self.targets['pwm_oscillation_limit']
-            
-            result = {
-                'status': 'passed' if is_passed else 'failed',
-                'max_oscillation': max_oscillation,
-                'avg_oscillation': avg_oscillation,
-                'target': self.targets['pwm_oscillation_limit'],
-                'time_window': time_window,
-                'num_windows': len(oscillations),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            self.logger.info(f"PWM振盪驗證: 最大振盪={max_oscillation:.1f}%, "
-                           f"目標≤{self.targets['pwm_oscillation_limit']}%")
+            # 計算滑動窗口內的振盪幅度（非數值的PWM略過）
+            oscillation = _OscillationStream(time_window)
+            oscillation.update(pd.to_numeric(df['pwm'], errors='coerce').to_numpy(dtype=np.float64))
             
-            return result
+            return self._pwm_oscillation_result(oscillation)
             
         except Exception as e:
             self.logger.error(f"PWM振盪驗證失敗: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def validate_response_time(self, csv_file: str) -> Dict:
+    def _correlation_result(self, correlation: float, p_value: float, sample_size: int) -> Dict:
+        """
+        建立相關係數驗證結果
+        
+        Args:
+            correlation: 相關係數
+            p_value: p值
+            sample_size: 樣本數
+            
+        Returns:
+            驗證結果字典
+        """
+        is_passed = correlation >= self.targets['correlation_target']
+        
+        result = {
+            'status': 'passed' if is_passed else 'failed',
+            'correlation_coefficient': correlation,
+            'p_value': p_value,
+            'target': self.targets['correlation_target'],
+            'is_significant': p_value < 0.05,
+            'sample_size': sample_size,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        self.logger.info(f"相關係數驗證: r={correlation:.3f}, 目標≥{self.targets['correlation_target']}")
+        
+        return result
+    
+    def _pwm_oscillation_result(self, oscillation: '_OscillationStream') -> Dict:
+        """
+        由振盪累加器建立PWM振盪驗證結果
+        
+        Args:
+            oscillation: 已累加全部PWM值的振盪累加器
+            
+        Returns:
+            驗證結果字典
+        """
+        time_window = oscillation.time_window
+        if oscillation.num_values < time_window:
+            return {'status': 'error', 'message': f'數據不足，需要至少{time_window}個數據點'}
+        
+        max_oscillation = oscillation.max_oscillation
+        avg_oscillation = oscillation.sum_oscillation / oscillation.num_windows
+        
+        # 驗證結果
+        is_passed = max_oscillation <= self.targets['pwm_oscillation_limit']
+        
+        result = {
+            'status': 'passed' if is_passed else 'failed',
+            'max_oscillation': max_oscillation,
+            'avg_oscillation': avg_oscillation,
+            'target': self.targets['pwm_oscillation_limit'],
+            'time_window': time_window,
+            'num_windows': oscillation.num_windows,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        self.logger.info(f"PWM振盪驗證: 最大振盪={max_oscillation:.1f}%, "
+                       f"目標≤{self.targets['pwm_oscillation_limit']}%")
+        
+        return result
+    
+    def validate_response_time(self, csv_file: Union[str, pd.DataFrame]) -> Dict:
         """
         驗證故障降級反應時間
         目標：故障降級反應時間 ≤ 1s
         
         Args:
-            csv_file: 日誌CSV文件路徑
+            csv_file: 日誌CSV文件路徑或已解析的DataFrame
             
         Returns:
             驗證結果字典
         """
         try:
             # 讀取數據
-            df = pd.read_csv(csv_file)
+            df = self._read_log(csv_file)
             
             if 'state' not in df.columns or 'timestamp' not in df.columns:
                 return {'status': 'error', 'message': '缺少狀態或時間戳數據'}
             
             # 轉換時間戳
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            # 尋找狀態變化到異常模式的時間
-            anomaly_transitions = []
-            
-            for i in range(1, len(df)):
-                if (df.iloc[i]['state'] == '異常模式' and 
-                    df.iloc[i-1]['state'] != '異常模式'):
-                    
-                    time_diff = (df.iloc[i]['timestamp'] - df.iloc[i-1]['timestamp']).total_seconds()
-                    anomaly_transitions.append(time_diff)
-            
-            if not anomaly_transitions:
-                return {
-                    'status': 'no_data',
-                    'message': '未檢測到異常狀態轉換',
-                    'transitions_found': 0
-                }
-            
-            max_response_time = max(anomaly_transitions)
-            avg_response_time = np.mean(anomaly_transitions)
-            
-            # 驗證結果
-            is_passed = max_response_time <= self.targets['response_time_limit']
-            
-            result = {
-                'status': 'passed' if is_passed else 'failed',
-                'max_response_time': max_response_time,
-                'avg_response_time': avg_response_time,
-                'target': self.targets['response_time_limit'],
-                'transitions_found': len(anomaly_transitions),
-                'all_response_times': anomaly_transitions,
-                'timestamp': datetime.now().isoformat()
-            }
+            df['timestamp'] = _to_datetime(df['timestamp'])
             
-            self.logger.info(f"反應時間驗證: 最大反應時間={max_response_time:.3f}s, "
-                           f"目標≤{self.targets['response_time_limit']}s")
+            # 尋找狀態變化到異常模式的時間（布林遮罩向量化）
+            transitions = _TransitionStream()
+            transitions.update(_state_mask(df['state'], '異常模式'),
+                               df['timestamp'].to_numpy(dtype='datetime64[ns]'))
             
-            return result
+            return self._response_time_result(transitions.result())
             
         except Exception as e:
             self.logger.error(f"反應時間驗證失敗: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    def validate_disappearance_hit_rate(self, csv_file: str, target_range: Tuple[float, float] = (2.0, 5.0)) -> Dict:
+    def _response_time_result(self, anomaly_transitions: np.ndarray) -> Dict:
+        """
+        由異常轉換耗時建立反應時間驗證結果
+        
+        Args:
+            anomaly_transitions: 各次轉換耗時（秒）
+            
+        Returns:
+            驗證結果字典
+        """
+        if len(anomaly_transitions) == 0:
+            return {
+                'status': 'no_data',
+                'message': '未檢測到異常狀態轉換',
+                'transitions_found': 0
+            }
+        
+        max_response_time = float(anomaly_transitions.max())
+        avg_response_time = float(anomaly_transitions.mean())
+        
+        # 驗證結果
+        is_passed = max_response_time <= self.targets['response_time_limit']
+        
+        result = {
+            'status': 'passed' if is_passed else 'failed',
+            'max_response_time': max_response_time,
+            'avg_response_time': avg_response_time,
+            'target': self.targets['response_time_limit'],
+            'transitions_found': len(anomaly_transitions),
+            'all_response_times': anomaly_transitions.tolist(),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        self.logger.info(f"反應時間驗證: 最大反應時間={max_response_time:.3f}s, "
+                       f"目標≤{self.targets['response_time_limit']}s")
+        
+        return result
+    
+    def validate_disappearance_hit_rate(self, csv_file: Union[str, pd.DataFrame], target_range: Tuple[float, float] = (2.0, 5.0)) -> Dict:
         """
         驗證T_disappear命中率
         目標：T_disappear命中率 ≥ 70%
         
         Args:
-            csv_file: 日誌CSV文件路徑
+            csv_file: 日誌CSV文件路徑或已解析的DataFrame
             target_range: 目標時間範圍 (最小值, 最大值)
             
         Returns:
@@ -245,64 +643,72 @@ class SystemValidator:
         """
         try:
             # 讀取數據
-            df = pd.read_csv(csv_file)
+            df = self._read_log(csv_file)
             
             if 'state' not in df.columns or 'timestamp' not in df.columns:
                 return {'status': 'error', 'message': '缺少狀態或時間戳數據'}
             
             # 轉換時間戳
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df['timestamp'] = _to_datetime(df['timestamp'])
             
             # 尋找餵食週期
-            feeding_cycles = []
-            current_cycle = {}
-            
-            for i, row in df.iterrows():
-                if row['state'] == '餵食中' and not current_cycle:
-                    current_cycle['start'] = row['timestamp']
-                elif row['state'] == '穩定等待' and current_cycle:
-                    current_cycle['end'] = row['timestamp']
-                    cycle_duration = (current_cycle['end'] - current_cycle['start']).total_seconds()
-                    feeding_cycles.append(cycle_duration)
-                    current_cycle = {}
-            
-            if not feeding_cycles:
-                return {
-                    'status': 'no_data',
-                    'message': '未檢測到完整的餵食週期',
-                    'cycles_found': 0
-                }
-            
-            # 計算命中率
-            hits = sum(1 for duration in feeding_cycles 
-                      if target_range[0] <= duration <= target_range[1])
-            hit_rate = hits / len(feeding_cycles)
-            
-            # 驗證結果
-            is_passed = hit_rate >= self.targets['hit_rate_target']
-            
-            result = {
-                'status': 'passed' if is_passed else 'failed',
-                'hit_rate': hit_rate,
-                'hits': hits,
-                'total_cycles': len(feeding_cycles),
-                'target': self.targets['hit_rate_target'],
-                'target_range': target_range,
-                'cycle_durations': feeding_cycles,
-                'avg_duration': np.mean(feeding_cycles),
-                'std_duration': np.std(feeding_cycles),
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            self.logger.info(f"T_disappear命中率驗證: {hit_rate:.3f} ({hits}/{len(feeding_cycles)}), "
-                           f"目標≥{self.targets['hit_rate_target']}")
+            cycles = _FeedingCycleStream()
+            cycles.update(_state_mask(df['state'], '餵食中'),
+                          _state_mask(df['state'], '穩定等待'),
+                          df['timestamp'].to_numpy(dtype='datetime64[ns]'))
             
-            return result
+            return self._hit_rate_result(cycles.result(), target_range)
             
         except Exception as e:
             self.logger.error(f"T_disappear驗證失敗: {e}")
             return {'status': 'error', 'message': str(e)}
     
+    def _hit_rate_result(self, feeding_cycles: np.ndarray,
+                         target_range: Tuple[float, float] = (2.0, 5.0)) -> Dict:
+        """
+        由餵食週期耗時建立T_disappear命中率驗證結果
+        
+        Args:
+            feeding_cycles: 各週期耗時（秒）
+            target_range: 目標時間範圍 (最小值, 最大值)
+            
+        Returns:
+            驗證結果字典
+        """
+        if len(feeding_cycles) == 0:
+            return {
+                'status': 'no_data',
+                'message': '未檢測到完整的餵食週期',
+                'cycles_found': 0
+            }
+        
+        # 計算命中率
+        hits = int(np.count_nonzero(
+            (feeding_cycles >= target_range[0]) & (feeding_cycles <= target_range[1])
+        ))
+        hit_rate = hits / len(feeding_cycles)
+        
+        # 驗證結果
+        is_passed = hit_rate >= self.targets['hit_rate_target']
+        
+        result = {
+            'status': 'passed' if is_passed else 'failed',
+            'hit_rate': hit_rate,
+            'hits': hits,
+            'total_cycles': len(feeding_cycles),
+            'target': self.targets['hit_rate_target'],
+            'target_range': target_range,
+            'cycle_durations': feeding_cycles.tolist(),
+            'avg_duration': float(feeding_cycles.mean()),
+            'std_duration': float(feeding_cycles.std()),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        self.logger.info(f"T_disappear命中率驗證: {hit_rate:.3f} ({hits}/{len(feeding_cycles)}), "
+                       f"目標≥{self.targets['hit_rate_target']}")
+        
+        return result
+    
     def generate_validation_report(self, csv_file: str, output_dir: str = "logs/validation/") -> str:
         """
         生成完整的驗證報告
@@ -318,12 +724,19 @@ class SystemValidator:
             # 創建輸出目錄
             os.makedirs(output_dir, exist_ok=True)
             
-            # 執行所有驗證
-            results = {}
-            results['correlation'] = self.validate_correlation(csv_file)
-            results['pwm_oscillation'] = self.validate_pwm_oscillation(csv_file)
-            results['response_time'] = self.validate_response_time(csv_file)
-            results['hit_rate'] = self.validate_disappearance_hit_rate(csv_file)
+            if os.path.getsize(csv_file) > _STREAMING_THRESHOLD_BYTES:
+                # 大型日誌分段串流，單次讀檔完成所有驗證
+                results, df = self._validate_streaming(csv_file)
+            else:
+                # 日誌只解析一次，供所有驗證與圖表共用
+                df = self._read_log(csv_file)
+                
+                # 執行所有驗證
+                results = {}
+                results['correlation'] = self.validate_correlation(df)
+                results['pwm_oscillation'] = self.validate_pwm_oscillation(df)
+                results['response_time'] = self.validate_response_time(df)
+                results['hit_rate'] = self.validate_disappearance_hit_rate(df)
             
             # 生成報告
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -404,7 +817,7 @@ class SystemValidator:
                     f.write("整體結果: 系統驗證失敗 ✗\n")
             
             # 生成圖表
-            self._generate_validation_plots(csv_file, results, output_dir, timestamp)
+            self._generate_validation_plots(df, results, output_dir, timestamp)
             
             self.logger.info(f"驗證報告已生成: {report_file}")
             return report_file
@@ -413,7 +826,81 @@ class SystemValidator:
             self.logger.error(f"生成驗證報告失敗: {e}")
             return ""
     
-    def _generate_demo_airflow_data(self, length: int) -> List[float]:
+    def _validate_streaming(self, csv_file: str,
+                            chunk_rows: int = _STREAM_CHUNK_ROWS) -> Tuple[Dict, pd.DataFrame]:
+        """
+        分段讀取日誌並同時更新所有驗證的累加器，記憶體用量與分段大小成正比
+        
+        Args:
+            csv_file: 日誌CSV文件路徑
+            chunk_rows: 每段列數
+            
+        Returns:
+            (各項驗證結果, 供圖表使用的等間隔抽樣DataFrame)
+        """
+        columns = list(pd.read_csv(csv_file, nrows=0).columns)
+        wanted = [c for c in ('timestamp', 'state', 'pwm', 'H') if c in columns]
+        has_h = 'H' in columns
+        has_pwm = 'pwm' in columns
+        has_state = 'state' in columns and 'timestamp' in columns
+        
+        total_rows = _count_csv_rows(csv_file)
+        row_bytes = os.path.getsize(csv_file) / max(total_rows, 1)
+        airflow_data = self._generate_demo_airflow_data(total_rows).astype(np.float64)
+        stride = max(1, total_rows // _PLOT_MAX_POINTS)
+        
+        correlation = _CorrelationStream()
+        oscillation = _OscillationStream(10)
+        transitions = _TransitionStream()
+        cycles = _FeedingCycleStream()
+        plot_parts = []
+        
+        offset = 0
+        for chunk in _iter_log_chunks(csv_file, wanted, chunk_rows, row_bytes):
+            n = len(chunk)
+            if has_h and offset + n <= total_rows:
+                correlation.update(airflow_data[offset:offset + n], chunk['H'].to_numpy(np.float64))
+            if has_pwm:
+                oscillation.update(pd.to_numeric(chunk['pwm'], errors='coerce').to_numpy(dtype=np.float64))
+            if 'timestamp' in chunk.columns:
+                chunk['timestamp'] = _to_datetime(chunk['timestamp'])
+            if has_state:
+                timestamps = chunk['timestamp'].to_numpy(dtype='datetime64[ns]')
+                transitions.update(_state_mask(chunk['state'], '異常模式'), timestamps)
+                cycles.update(_state_mask(chunk['state'], '餵食中'),
+                              _state_mask(chunk['state'], '穩定等待'), timestamps)
+            
+            # 以全域列號等間隔抽樣供圖表使用
+            keep = np.flatnonzero((np.arange(offset, offset + n) % stride) == 0)
+            sample = chunk.iloc[keep]
+            sample.index = offset + keep
+            plot_parts.append(sample)
+            offset += n
+        
+        results = {}
+        if not has_h:
+            results['correlation'] = {'status': 'error', 'message': '缺少H值數據'}
+        elif offset != total_rows:
+            results['correlation'] = {'status': 'error', 'message': 'airflow數據長度不匹配'}
+        else:
+            results['correlation'] = self._correlation_result(*correlation.result(), correlation.n)
+        
+        if has_pwm:
+            results['pwm_oscillation'] = self._pwm_oscillation_result(oscillation)
+        else:
+            results['pwm_oscillation'] = {'status': 'error', 'message': '缺少PWM數據'}
+        
+        if has_state:
+            results['response_time'] = self._response_time_result(transitions.result())
+            results['hit_rate'] = self._hit_rate_result(cycles.result())
+        else:
+            results['response_time'] = {'status': 'error', 'message': '缺少狀態或時間戳數據'}
+            results['hit_rate'] = {'status': 'error', 'message': '缺少狀態或時間戳數據'}
+        
+        plot_df = pd.concat(plot_parts) if plot_parts else pd.DataFrame(columns=wanted)
+        return results, plot_df
+    
+    def _generate_demo_airflow_data(self, length: int) -> np.ndarray:
         """
         生成演示用的氣泡盤檔位數據
         模擬展示缸的真實airflow檔位
@@ -422,40 +909,49 @@ class SystemValidator:
             length: 數據長度
             
         Returns:
-            氣泡盤檔位列表
+            氣泡盤檔位陣列
         """
-        # 生成週期性變化的檔位數據（0-7檔）
-        airflow_data = []
-        for i in range(length):
-            # 使用正弦波生成週期性變化
-            phase = (i / length) * 4 * np.pi  # 4個週期
-            level = int(3.5 + 3.5 * np.sin(phase))  # 0-7的範圍
-            airflow_data.append(level)
+        # 使用正弦波生成週期性變化的檔位數據（0-7檔，4個週期）
+        phase = np.linspace(0.0, 4 * np.pi, length, endpoint=False)
+        return (3.5 + 3.5 * np.sin(phase)).astype(np.int64)
+    
+    def _get_plot_figure(self):
+        """
+        獲取驗證圖表的Figure與子圖，首次呼叫時建立並固定版面
         
-        return airflow_data
+        Returns:
+            (Figure, 2x2子圖陣列)
+        """
+        if self._fig is None:
+            self._fig, self._axes = plt.subplots(2, 2, figsize=(15, 10))
+            self._fig.suptitle('系統驗證分析圖表', fontsize=16)
+            self._fig.subplots_adjust(left=0.06, right=0.98, bottom=0.06, top=0.92,
+                                      wspace=0.2, hspace=0.3)
+        return self._fig, self._axes
     
-    def _generate_validation_plots(self, csv_file: str, results: Dict, 
+    def _generate_validation_plots(self, csv_file: Union[str, pd.DataFrame], results: Dict, 
                                  output_dir: str, timestamp: str):
         """
         生成驗證相關的圖表
         
         Args:
-            csv_file: 數據文件路徑
+            csv_file: 數據文件路徑或已解析的DataFrame
             results: 驗證結果
             output_dir: 輸出目錄
             timestamp: 時間戳
         """
         try:
             # 讀取數據
-            df = pd.read_csv(csv_file)
+            df = self._read_log(csv_file)
             
-            # 創建圖表
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            fig.suptitle('系統驗證分析圖表', fontsize=16)
+            # 獲取圖表並清除上一份報告的內容
+            fig, axes = self._get_plot_figure()
+            for ax in axes.flat:
+                ax.cla()
             
             # 1. H值與時間關係
             if 'H' in df.columns and 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df['timestamp'] = _to_datetime(df['timestamp'])
                 axes[0, 0].plot(df['timestamp'], pd.to_numeric(df['H'], errors='coerce'))
                 axes[0, 0].set_title('活躍度H值變化')
                 axes[0, 0].set_ylabel('H值')
@@ -490,12 +986,9 @@ class SystemValidator:
                 axes[1, 1].set_ylabel('振盪幅度 (%)')
                 axes[1, 1].axhline(y=target, color='blue', linestyle='--', alpha=0.7)
             
-            plt.tight_layout()
-            
-            # 保存圖表
+            # 保存圖表（版面已於建立時固定）
             plot_file = os.path.join(output_dir, f"validation_plots_{timestamp}.png")
-            plt.savefig(plot_file, dpi=300, bbox_inches='tight')
-            plt.close()
+            fig.savefig(plot_file, dpi=120)
             
             self.logger.info(f"驗證圖表已生成: {plot_file}")
             
@@ -3,8 +3,8 @@
 包含影像前處理、特徵提取、特徵融合等功能
 """
 
-from .image_processor import ImageProcessor
-from .feature_extractor import FeatureExtractor
+from .image_processor import ImageProcessor, configure_opencl
+from .feature_extractor import FeatureExtractor, Features, FEAT_IDX
 from .vision_node import VisionNode
 
 # 主要對外接口
@@ -12,7 +12,10 @@ VisionProcessor = VisionNode
 
 __all__ = [
     'ImageProcessor',
+    'configure_opencl',
     'FeatureExtractor', 
+    'Features',
+    'FEAT_IDX',
     'VisionNode',
     'VisionProcessor'
 ]
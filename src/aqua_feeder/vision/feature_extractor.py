@@ -5,10 +5,187 @@
 
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, NamedTuple
 import logging
-from scipy import fftpack
-from collections import deque
+from scipy.fft import rfft2
+
+# 可用時以pyfftw（快取FFTW_MEASURE計畫）計算RSI的2D FFT
+try:
+    import pyfftw
+    PYFFTW_AVAILABLE = True
+except ImportError:
+    PYFFTW_AVAILABLE = False
+
+from ..utils.jit import NUMBA_AVAILABLE, get_num_threads, njit, prange, register_warmup
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _motion_pixel_count(ring, cur, prev, thresh):
+    """
+    單次遍歷計算幀差超過閾值的像素數（融合absdiff、閾值化與計數）
+    直接讀取環形緩衝區的兩個切片，不建立幀視圖
+    
+    Args:
+        ring: (N, H, W) uint8歷史幀緩衝區
+        cur, prev: 當前幀與前一幀在緩衝區中的索引
+        thresh: 幀差閾值
+        
+    Returns:
+        動態像素數
+    """
+    count = 0
+    for i in prange(ring.shape[1]):
+        row_count = 0
+        for j in range(ring.shape[2]):
+            if abs(np.int16(ring[cur, i, j]) - np.int16(ring[prev, i, j])) > thresh:
+                row_count += 1
+        count += row_count
+    return count
+
+@register_warmup
+def _warmup_motion_pixel_count():
+    """預熱動態能量核心"""
+    sample = np.zeros((2, 4, 4), dtype=np.uint8)
+    _motion_pixel_count(sample, 1, 0, 15)
+
+@njit(cache=True)
+def _reflect101(p, n):
+    """BORDER_REFLECT_101邊界索引（與OpenCV預設一致）"""
+    if n == 1:
+        return 0
+    while p < 0 or p >= n:
+        if p < 0:
+            p = -p
+        else:
+            p = 2 * n - 2 - p
+    return p
+
+@njit(fastmath=True, cache=True)
+def _fused_row(ring, cur, prev, i, thresh, k_low, k_high, col_low, col_high, low, smooth):
+    """
+    融合核心的單行計算：可分離高斯濾波（先垂直後水平）得到低通與平滑結果，
+    並於同一行內完成幀差計數
+    行緩衝區由呼叫端配置（每個區塊一份），此處只清零重複使用
+    
+    Returns:
+        (該行動態像素數, 該行高頻能量, 該行低頻能量)
+    """
+    rows = ring.shape[1]
+    cols = ring.shape[2]
+    r_low = k_low.shape[0] // 2
+    r_high = k_high.shape[0] // 2
+    
+    # 垂直方向濾波，結果兩側以反射填充供水平方向使用
+    col_low[:] = 0.0
+    col_high[:] = 0.0
+    for t in range(k_low.shape[0]):
+        src = ring[cur, _reflect101(i - r_low + t, rows)]
+        w = k_low[t]
+        for j in range(cols):
+            col_low[r_low + j] += w * np.float32(src[j])
+    for t in range(k_high.shape[0]):
+        src = ring[cur, _reflect101(i - r_high + t, rows)]
+        w = k_high[t]
+        for j in range(cols):
+            col_high[r_high + j] += w * np.float32(src[j])
+    for j in range(r_low):
+        col_low[r_low - 1 - j] = col_low[r_low + _reflect101(-1 - j, cols)]
+        col_low[r_low + cols + j] = col_low[r_low + _reflect101(cols + j, cols)]
+    for j in range(r_high):
+        col_high[r_high - 1 - j] = col_high[r_high + _reflect101(-1 - j, cols)]
+        col_high[r_high + cols + j] = col_high[r_high + _reflect101(cols + j, cols)]
+    
+    # 水平方向濾波（逐核係數累加整行，便於向量化）
+    low[:] = 0.0
+    smooth[:] = 0.0
+    for t in range(k_low.shape[0]):
+        w = k_low[t]
+        for j in range(cols):
+            low[j] += w * col_low[j + t]
+    for t in range(k_high.shape[0]):
+        w = k_high[t]
+        for j in range(cols):
+            smooth[j] += w * col_high[j + t]
+    
+    row_count = 0
+    row_hi = 0.0
+    row_lo = 0.0
+    cur_row = ring[cur, i]
+    prev_row = ring[prev, i]
+    for j in range(cols):
+        if abs(np.int16(cur_row[j]) - np.int16(prev_row[j])) > thresh:
+            row_count += 1
+        high = np.float32(cur_row[j]) - smooth[j]
+        row_lo += low[j] * low[j]
+        row_hi += high * high
+    return row_count, row_hi, row_lo
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _fused_motion_ripple(ring, cur, prev, thresh, k_low, k_high, n_chunks):
+    """
+    單次逐行遍歷同時計算動態像素數與波紋頻帶能量
+    每行像素只讀入一次，濾波中間結果留在行緩衝內
+    列切成n_chunks個連續區塊平行處理，行緩衝區每個區塊只配置一次
+    
+    Args:
+        ring: (N, H, W) uint8歷史幀緩衝區
+        cur, prev: 當前幀與前一幀在緩衝區中的索引
+        thresh: 幀差閾值
+        k_low: 低頻截止的高斯核 (float32)
+        k_high: 高頻截止的高斯核 (float32)
+        n_chunks: 平行區塊數（通常為執行緒數）
+        
+    Returns:
+        (動態像素數, 高頻能量, 低頻能量)
+    """
+    rows = ring.shape[1]
+    cols = ring.shape[2]
+    n_chunks = max(1, min(n_chunks, rows))
+    count = 0
+    hi_energy = 0.0
+    lo_energy = 0.0
+    for c in prange(n_chunks):
+        col_low = np.empty(cols + 2 * (k_low.shape[0] // 2), dtype=np.float32)
+        col_high = np.empty(cols + 2 * (k_high.shape[0] // 2), dtype=np.float32)
+        low = np.empty(cols, dtype=np.float32)
+        smooth = np.empty(cols, dtype=np.float32)
+        chunk_count = 0
+        chunk_hi = 0.0
+        chunk_lo = 0.0
+        for i in range(c * rows // n_chunks, (c + 1) * rows // n_chunks):
+            row_count, row_hi, row_lo = _fused_row(ring, cur, prev, i, thresh, k_low, k_high,
+                                                   col_low, col_high, low, smooth)
+            chunk_count += row_count
+            chunk_hi += row_hi
+            chunk_lo += row_lo
+        count += chunk_count
+        hi_energy += chunk_hi
+        lo_energy += chunk_lo
+    return count, hi_energy, lo_energy
+
+@register_warmup
+def _warmup_fused_motion_ripple():
+    """預熱動態能量與波紋頻帶融合核心"""
+    sample = np.zeros((2, 4, 4), dtype=np.uint8)
+    taps = np.full(3, 1.0 / 3.0, dtype=np.float32)
+    _fused_motion_ripple(sample, 1, 0, 15, taps, taps, get_num_threads())
+
+class Features(NamedTuple):
+    """
+    單幀特徵值
+    欄位順序與 aqua_feeder/features 話題的特徵向量一致
+    """
+    RSI: float
+    POP: float
+    FLOW: float
+    ME_ring: float
+    ME: float
+    
+    def get(self, name: str, default: float = 0.0) -> float:
+        """以特徵名稱取值（相容字典介面）"""
+        return getattr(self, name, default) if name in self._fields else default
+
+# 特徵名稱 → 特徵向量索引（與Features欄位順序一致）
+FEAT_IDX = {name: i for i, name in enumerate(Features._fields)}
 
 class FeatureExtractor:
     """特徵提取器"""
@@ -23,26 +200,63 @@ class FeatureExtractor:
         self.config = config
         self.logger = logging.getLogger(__name__)
         
-        # 提取配置
-        self.feature_config = config.get('feature_extraction', {})
+        # 提取配置（完整系統配置的特徵參數位於vision區段下）
+        self.feature_config = config.get('vision', config).get('feature_extraction', {})
         
-        # 動態能量計算用的歷史幀
+        # 環狀區域歷史幀的環形緩衝區 (N, H, W)，首幀時依ROI尺寸配置
+        # 動態能量與光流共用，每幀僅複製一次
         temporal_window = self.feature_config.get('motion_energy', {}).get('temporal_window', 5)
-        self.frame_buffer = deque(maxlen=temporal_window)
+        self.buffer_size = max(2, temporal_window)
+        self._frame_ring = None
+        self._ring_head = 0   # 下一個寫入位置
+        self._ring_count = 0  # 已存入的幀數
+        self.me_threshold = self.feature_config.get('motion_energy', {}).get('threshold', 15)
         
-        # 光流計算器
+        # 破泡檢測參數
+        bubble_config = self.feature_config.get('bubble_pop', {})
+        self.bubble_min_area = bubble_config.get('min_area', 50)
+        self.bubble_max_area = bubble_config.get('max_area', 500)
+        self.bubble_circularity_threshold = bubble_config.get('circularity_threshold', 0.7)
+        self.bubble_blur_ksize = (5, 5)
+        self.bubble_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        
+        # 光流計算器（Farneback稠密光流，於縮小後的ROI上計算）
+        flow_config = self.feature_config.get('optical_flow', {})
+        self.flow_scale = flow_config.get('scale', 0.5)
+        self._flow_prev_small = None
+        # 縮小幀的雙緩衝區，當前幀寫入上一幀未使用的那一個
+        self._flow_small_bufs = [None, None]
+        self._flow_small_idx = 0
         self.flow_params = dict(
             pyr_scale=0.5,
-            levels=self.feature_config.get('optical_flow', {}).get('pyramid_levels', 3),
-            winsize=self.feature_config.get('optical_flow', {}).get('window_size', 15),
+            levels=flow_config.get('pyramid_levels', 3),
+            winsize=flow_config.get('window_size', 15),
             iterations=3,
             poly_n=5,
             poly_sigma=1.1,
             flags=0
         )
         
-        # 前一幀（用於光流計算）
-        self.prev_frame = None
+        # 波紋頻譜指數計算方式: 'fft' (2D FFT頻帶能量) 或 'spatial' (高斯濾波頻帶估計)
+        rsi_config = self.feature_config.get('ripple_spectral', {})
+        self.rsi_method = rsi_config.get('method', 'fft')
+        self.rsi_high_freq_start = rsi_config.get('high_freq_start', 0.3)
+        self.rsi_low_freq_end = rsi_config.get('low_freq_end', 0.1)
+        self.rsi_sigma_low = self._cutoff_sigma(self.rsi_low_freq_end)
+        self.rsi_sigma_high = self._cutoff_sigma(self.rsi_high_freq_start)
+        
+        # 頻率掩碼快取 {(rows, cols): (高頻索引, 低頻索引)}
+        self._freq_masks = {}
+        
+        # pyfftw的rfft2計畫快取 {(rows, cols): FFTW物件}，每個ROI尺寸只規劃一次
+        self._rfft_plans = {}
+        
+        # spatial模式的高斯核（預先計算，融合核心與OpenCV路徑共用）
+        self.rsi_taps_low = self._gaussian_taps(self.rsi_sigma_low)
+        self.rsi_taps_high = self._gaussian_taps(self.rsi_sigma_high)
+        
+        # spatial模式下ME與RSI可由融合核心單次遍歷求得
+        self.fused_spatial = NUMBA_AVAILABLE and self.rsi_method == 'spatial'
         
         # 基線值
         fusion_config = config.get('feature_fusion', {})
@@ -50,49 +264,103 @@ class FeatureExtractor:
         self.ME0 = self.baseline.get('ME0', 10.0)
         self.RSI0 = self.baseline.get('RSI0', 0.2)
         
-    def extract_features(self, rois: Dict[str, np.ndarray]) -> Dict[str, float]:
+        # 中間結果暫存緩衝區 {用途: 陣列}，首次使用或尺寸改變時配置，之後每幀重複使用
+        self._scratch = {}
+        
+    def _get_scratch(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """取得指定用途的暫存緩衝區，尺寸或型別改變時重新配置"""
+        buf = self._scratch.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._scratch[name] = buf
+        return buf
+    
+    def extract_features(self, rois: Dict[str, np.ndarray],
+                         out: Optional[np.ndarray] = None):
         """
         從ROI中提取所有特徵
         
         Args:
             rois: ROI字典 {'roi_bub': array, 'roi_ring': array}
+            out: 可選的特徵向量輸出緩衝區 (5,)，依FEAT_IDX索引寫入
             
         Returns:
-            特徵字典 {'ME': float, 'RSI': float, 'POP': float, 'FLOW': float}
+            Features(RSI, POP, FLOW, ME_ring, ME)；指定out時返回out
         """
-        features = {}
-        
-        # 動態能量 (Motion Energy)
-        if 'roi_ring' in rois:
-            features['ME'] = self._extract_motion_energy(rois['roi_ring'])
-            features['ME_ring'] = features['ME']  # 環狀區域的動態能量
-        else:
-            features['ME'] = 0.0
-            features['ME_ring'] = 0.0
+        roi_ring = rois.get('roi_ring')
+        roi_bub = rois.get('roi_bub')
         
-        # 波紋頻譜指數 (Ripple Spectral Index)
-        if 'roi_ring' in rois:
-            features['RSI'] = self._extract_ripple_spectral_index(rois['roi_ring'])
+        if roi_ring is not None:
+            self._push_frame(roi_ring)
+            
+            indices = self._frame_pair_indices()
+            if self.fused_spatial and indices is not None:
+                # 動態能量與波紋頻譜指數單次遍歷
+                me, rsi = self._extract_motion_and_ripple_fused(*indices)
+            else:
+                # 動態能量 (Motion Energy)，環狀區域的動態能量即為ME
+                me = self._extract_motion_energy(roi_ring)
+                # 波紋頻譜指數 (Ripple Spectral Index)
+                rsi = self._extract_ripple_spectral_index(roi_ring)
+            # 光流不一致度 (Optical Flow Inconsistency)
+            flow = self._extract_optical_flow_inconsistency(roi_ring)
         else:
-            features['RSI'] = self.RSI0
+            me = 0.0
+            rsi = self.RSI0
+            flow = 0.0
         
         # 破泡事件率 (Bubble Pop Events)
-        if 'roi_bub' in rois:
-            features['POP'] = self._extract_bubble_pop_events(rois['roi_bub'])
+        if roi_bub is not None:
+            pop = self._extract_bubble_pop_events(roi_bub)
         else:
-            features['POP'] = 0.0
+            pop = 0.0
         
-        # 光流不一致度 (Optical Flow Inconsistency)
-        if 'roi_ring' in rois:
-            features['FLOW'] = self._extract_optical_flow_inconsistency(rois['roi_ring'])
-        else:
-            features['FLOW'] = 0.0
+        if out is not None:
+            out[FEAT_IDX['RSI']] = rsi
+            out[FEAT_IDX['POP']] = pop
+            out[FEAT_IDX['FLOW']] = flow
+            out[FEAT_IDX['ME_ring']] = me
+            out[FEAT_IDX['ME']] = me
+            return out
         
-        return features
+        return Features(RSI=rsi, POP=pop, FLOW=flow, ME_ring=me, ME=me)
+    
+    def _push_frame(self, roi: np.ndarray):
+        """
+        將當前幀複製進環形緩衝區
+        ROI尺寸改變時重新配置並清空歷史
+        
+        Args:
+            roi: 環狀區域影像
+        """
+        ring = self._frame_ring
+        if ring is None or ring.shape[1:] != roi.shape:
+            ring = np.empty((self.buffer_size,) + roi.shape, dtype=np.uint8)
+            self._frame_ring = ring
+            self._ring_head = 0
+            self._ring_count = 0
+        
+        np.copyto(ring[self._ring_head], roi)
+        self._ring_head = (self._ring_head + 1) % self.buffer_size
+        self._ring_count = min(self._ring_count + 1, self.buffer_size)
+    
+    def _frame_pair_indices(self) -> Optional[Tuple[int, int]]:
+        """
+        獲取緩衝區中最近兩幀的索引
+        
+        Returns:
+            (當前幀索引, 前一幀索引)，不足兩幀時返回None
+        """
+        if self._ring_count < 2:
+            return None
+        
+        head = self._ring_head
+        return (head - 1) % self.buffer_size, (head - 2) % self.buffer_size
     
     def _extract_motion_energy(self, roi: np.ndarray) -> float:
         """
         提取動態能量特徵
+        當前幀需已透過_push_frame存入緩衝區
         
         Args:
             roi: 感興趣區域影像
@@ -100,26 +368,30 @@ class FeatureExtractor:
         Returns:
             動態能量值
         """
-        # 將當前幀加入緩衝區
-        self.frame_buffer.append(roi.copy())
-        
-        if len(self.frame_buffer) < 2:
+        indices = self._frame_pair_indices()
+        if indices is None:
             return self.ME0
         
         # 計算相鄰幀差
-        current_frame = self.frame_buffer[-1]
-        prev_frame = self.frame_buffer[-2]
-        
-        # 幀差
-        diff = cv2.absdiff(current_frame, prev_frame)
+        cur_idx, prev_idx = indices
+        ring = self._frame_ring
         
-        # 閾值化
-        threshold = self.feature_config.get('motion_energy', {}).get('threshold', 15)
-        _, binary = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
+        if NUMBA_AVAILABLE:
+            # 幀差、閾值化、計數融合為單次遍歷
+            motion_pixels = _motion_pixel_count(ring, cur_idx, prev_idx, self.me_threshold)
+        else:
+            # 幀差
+            shape = ring.shape[1:]
+            diff = cv2.absdiff(ring[cur_idx], ring[prev_idx],
+                               self._get_scratch('me_diff', shape, np.uint8))
+            
+            # 閾值化並以SIMD計數非零像素
+            binary = cv2.compare(diff, self.me_threshold, cv2.CMP_GT,
+                                 self._get_scratch('me_binary', shape, np.uint8))
+            motion_pixels = cv2.countNonZero(binary)
         
         # 計算動態像素比例
-        motion_pixels = np.sum(binary > 0)
-        total_pixels = binary.shape[0] * binary.shape[1]
+        total_pixels = ring.shape[1] * ring.shape[2]
         
         if total_pixels > 0:
             motion_energy = (motion_pixels / total_pixels) * 100.0
@@ -128,6 +400,60 @@ class FeatureExtractor:
         
         return motion_energy
     
+    @staticmethod
+    def _cutoff_sigma(normalized_freq: float) -> float:
+        """
+        由正規化截止頻率（1.0為Nyquist）換算高斯濾波的空間sigma
+        使濾波器頻率響應在截止頻率處衰減為一半
+        
+        Args:
+            normalized_freq: 正規化頻率
+            
+        Returns:
+            高斯sigma (像素)
+        """
+        cycles_per_pixel = max(normalized_freq, 1e-3) * 0.5
+        return float(np.sqrt(np.log(2.0) / 2.0) / (np.pi * cycles_per_pixel))
+    
+    @staticmethod
+    def _gaussian_taps(sigma: float) -> np.ndarray:
+        """
+        一維高斯核，核長與cv2.GaussianBlur對浮點影像自動選取的一致
+        
+        Args:
+            sigma: 高斯sigma (像素)
+            
+        Returns:
+            float32高斯核
+        """
+        ksize = int(round(sigma * 4 * 2 + 1)) | 1
+        return cv2.getGaussianKernel(ksize, sigma, cv2.CV_32F).ravel()
+    
+    def _extract_motion_and_ripple_fused(self, cur_idx: int, prev_idx: int) -> Tuple[float, float]:
+        """
+        以融合核心同時計算動態能量與（spatial模式的）波紋頻譜指數
+        
+        Args:
+            cur_idx, prev_idx: 當前幀與前一幀在緩衝區中的索引
+            
+        Returns:
+            (ME值, RSI值)
+        """
+        try:
+            ring = self._frame_ring
+            motion_pixels, high_freq_energy, low_freq_energy = _fused_motion_ripple(
+                ring, cur_idx, prev_idx, self.me_threshold,
+                self.rsi_taps_low, self.rsi_taps_high, get_num_threads()
+            )
+            
+            motion_energy = (motion_pixels / (ring.shape[1] * ring.shape[2])) * 100.0
+            rsi = high_freq_energy / low_freq_energy if low_freq_energy > 0 else self.RSI0
+            return motion_energy, float(rsi)
+            
+        except Exception as e:
+            self.logger.warning(f"ME/RSI融合計算失敗: {e}")
+            return self._extract_motion_energy(None), self.RSI0
+    
     def _extract_ripple_spectral_index(self, roi: np.ndarray) -> float:
         """
         提取波紋頻譜指數
@@ -138,36 +464,33 @@ class FeatureExtractor:
         Returns:
             RSI值
         """
+        if self.rsi_method == 'spatial':
+            return self._extract_ripple_spectral_index_spatial(roi)
+        
         try:
-            # 計算2D FFT
-            f_transform = fftpack.fft2(roi.astype(np.float32))
-            f_shift = fftpack.fftshift(f_transform)
-            magnitude_spectrum = np.abs(f_shift)
-            
-            # 獲取頻域配置
-            fft_config = self.feature_config.get('ripple_spectral', {})
-            high_freq_start = fft_config.get('high_freq_start', 0.3)
-            low_freq_end = fft_config.get('low_freq_end', 0.1)
-            
-            # 計算頻率座標
-            rows, cols = roi.shape
-            center_row, center_col = rows // 2, cols // 2
-            
-            # 創建頻率掩碼
-            y, x = np.ogrid[:rows, :cols]
-            distance = np.sqrt((x - center_col)**2 + (y - center_row)**2)
-            max_distance = min(center_row, center_col)
+            # 計算實數輸入2D FFT（只含非冗餘的半頻譜）
+            if PYFFTW_AVAILABLE:
+                # 複製進計畫的對齊輸入陣列後執行，輸出寫入計畫自身的輸出陣列
+                plan = self._get_rfft_plan(roi.shape)
+                np.copyto(plan.input_array, roi)
+                spectrum = plan().ravel()
+            else:
+                roi_float = self._get_scratch('rsi_float', roi.shape, np.float32)
+                np.copyto(roi_float, roi)
+                spectrum = rfft2(roi_float, workers=-1).ravel()
             
-            # 正規化距離 (0-1)
-            normalized_distance = distance / max_distance
+            # 頻率掩碼（依ROI尺寸快取）
+            high_freq_idx, low_freq_idx = self._get_freq_masks(roi.shape)
             
-            # 高頻和低頻掩碼
-            high_freq_mask = normalized_distance >= high_freq_start
-            low_freq_mask = normalized_distance <= low_freq_end
+            # 頻帶係數收集到暫存緩衝區
+            high_band = np.take(spectrum, high_freq_idx,
+                                out=self._get_scratch('rsi_high', high_freq_idx.shape, spectrum.dtype))
+            low_band = np.take(spectrum, low_freq_idx,
+                               out=self._get_scratch('rsi_low', low_freq_idx.shape, spectrum.dtype))
             
-            # 計算能量
-            high_freq_energy = np.sum(magnitude_spectrum[high_freq_mask]**2)
-            low_freq_energy = np.sum(magnitude_spectrum[low_freq_mask]**2)
+            # 計算能量：複數以(實部, 虛部)的float32視圖交給cv2.norm單次平方和
+            high_freq_energy = cv2.norm(high_band.view(np.float32), cv2.NORM_L2SQR)
+            low_freq_energy = cv2.norm(low_band.view(np.float32), cv2.NORM_L2SQR)
             
             # 計算RSI
             if low_freq_energy > 0:
@@ -181,6 +504,104 @@ class FeatureExtractor:
             self.logger.warning(f"RSI計算失敗: {e}")
             return self.RSI0
     
+    def _get_rfft_plan(self, shape: Tuple[int, int]):
+        """
+        獲取指定尺寸的pyfftw rfft2計畫，首次使用時以FFTW_MEASURE規劃
+        
+        Args:
+            shape: ROI尺寸 (rows, cols)
+            
+        Returns:
+            pyfftw.FFTW物件（無參數呼叫即對其input_array執行變換）
+        """
+        plan = self._rfft_plans.get(shape)
+        if plan is None:
+            plan = pyfftw.builders.rfft2(
+                pyfftw.empty_aligned(shape, dtype=np.float32),
+                threads=1,
+                planner_effort='FFTW_MEASURE',
+                overwrite_input=True,
+                auto_align_input=True
+            )
+            self._rfft_plans[shape] = plan
+        return plan
+    
+    def _get_freq_masks(self, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        獲取高頻與低頻區域在rfft2半頻譜上的扁平索引，每個ROI尺寸只計算一次
+        共軛對稱而被省略的一半頻譜以重複索引補回，能量總和與完整頻譜相同
+        
+        Args:
+            shape: ROI尺寸 (rows, cols)
+            
+        Returns:
+            (高頻索引, 低頻索引)
+        """
+        masks = self._freq_masks.get(shape)
+        if masks is not None:
+            return masks
+        
+        # 計算頻率座標（未shift的自然順序，列方向含負頻率，行方向只有非負頻率）
+        rows, cols = shape
+        half_cols = cols // 2 + 1
+        
+        y = np.minimum(np.arange(rows), rows - np.arange(rows))[:, np.newaxis]
+        x = np.arange(half_cols)[np.newaxis, :]
+        distance = np.sqrt(x**2 + y**2)
+        max_distance = min(rows // 2, cols // 2)
+        
+        # 正規化距離 (0-1)
+        normalized_distance = (distance / max_distance).ravel()
+        
+        # 除直流與Nyquist行外，其餘行在完整頻譜中各有一個共軛對應
+        mirrored = np.zeros((rows, half_cols), dtype=bool)
+        mirrored[:, 1:(cols + 1) // 2] = True
+        mirrored = mirrored.ravel()
+        
+        def band_indices(band_mask: np.ndarray) -> np.ndarray:
+            return np.sort(np.concatenate([np.flatnonzero(band_mask),
+                                           np.flatnonzero(band_mask & mirrored)]))
+        
+        masks = (band_indices(normalized_distance >= self.rsi_high_freq_start),
+                 band_indices(normalized_distance <= self.rsi_low_freq_end))
+        self._freq_masks[shape] = masks
+        return masks
+    
+    def _extract_ripple_spectral_index_spatial(self, roi: np.ndarray) -> float:
+        """
+        以高斯濾波估計波紋頻譜指數，不需2D FFT
+        低頻能量取低通結果，高頻能量取原圖減去高通截止處的平滑結果
+        
+        Args:
+            roi: 感興趣區域影像
+            
+        Returns:
+            RSI值
+        """
+        try:
+            shape = roi.shape
+            roi_float = self._get_scratch('rsi_float', shape, np.float32)
+            np.copyto(roi_float, roi)
+            
+            # 以預先計算的高斯核做可分離濾波（等同cv2.GaussianBlur）
+            low = cv2.sepFilter2D(roi_float, -1, self.rsi_taps_low, self.rsi_taps_low,
+                                  self._get_scratch('rsi_low_pass', shape, np.float32))
+            smooth = cv2.sepFilter2D(roi_float, -1, self.rsi_taps_high, self.rsi_taps_high,
+                                     self._get_scratch('rsi_smooth', shape, np.float32))
+            # 高頻成分直接覆寫平滑結果
+            high = cv2.subtract(roi_float, smooth, smooth)
+            
+            high_freq_energy = cv2.norm(high, cv2.NORM_L2SQR)
+            low_freq_energy = cv2.norm(low, cv2.NORM_L2SQR)
+            
+            if low_freq_energy > 0:
+                return float(high_freq_energy / low_freq_energy)
+            return self.RSI0
+            
+        except Exception as e:
+            self.logger.warning(f"RSI計算失敗: {e}")
+            return self.RSI0
+    
     def _extract_bubble_pop_events(self, roi: np.ndarray) -> float:
         """
         提取破泡事件率
@@ -192,38 +613,37 @@ class FeatureExtractor:
             POP值（每秒破泡事件數）
         """
         try:
+            shape = roi.shape
+            
             # 高斯模糊
-            blurred = cv2.GaussianBlur(roi, (5, 5), 0)
+            blurred = cv2.GaussianBlur(roi, self.bubble_blur_ksize, 0,
+                                       self._get_scratch('pop_blurred', shape, np.uint8))
             
             # 自適應閾值
             binary = cv2.adaptiveThreshold(
                 blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
+                cv2.THRESH_BINARY, 11, 2,
+                self._get_scratch('pop_binary', shape, np.uint8)
             )
             
-            # 形態學運算
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-            binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
+            # 形態學運算（結果寫回模糊影像的緩衝區）
+            binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, self.bubble_kernel, blurred)
             
             # 尋找輪廓
             contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
             # 篩選氣泡輪廓
-            bubble_config = self.feature_config.get('bubble_pop', {})
-            min_area = bubble_config.get('min_area', 50)
-            max_area = bubble_config.get('max_area', 500)
-            circularity_threshold = bubble_config.get('circularity_threshold', 0.7)
-            
-            bubble_count = 0
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if min_area <= area <= max_area:
-                    # 檢查圓形度
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * area / (perimeter * perimeter)
-                        if circularity >= circularity_threshold:
-                            bubble_count += 1
+            min_area, max_area = self.bubble_min_area, self.bubble_max_area
+            
+            # 面積以單一布林遮罩篩選，只對通過者計算周長
+            areas = np.array([cv2.contourArea(contour) for contour in contours], dtype=np.float64)
+            candidates = np.flatnonzero((areas >= min_area) & (areas <= max_area))
+            perimeters = np.array([cv2.arcLength(contours[i], True) for i in candidates], dtype=np.float64)
+            
+            # 檢查圓形度
+            valid = perimeters > 0
+            circularity = 4 * np.pi * areas[candidates][valid] / (perimeters[valid] * perimeters[valid])
+            bubble_count = int(np.count_nonzero(circularity >= self.bubble_circularity_threshold))
             
             # 假設30fps，估算每秒破泡數
             pop_rate = bubble_count * 30.0 / 1000.0  # 簡化計算
@@ -237,39 +657,48 @@ class FeatureExtractor:
     def _extract_optical_flow_inconsistency(self, roi: np.ndarray) -> float:
         """
         提取光流不一致度
+        以縮小後的相鄰兩幀計算Farneback稠密光流，取速度大小的標準差
         
         Args:
             roi: 感興趣區域影像
             
         Returns:
-            FLOW值
+            FLOW值（換算回原始解析度的像素位移）
         """
         try:
-            if self.prev_frame is None:
-                self.prev_frame = roi.copy()
+            # 縮小幀寫入雙緩衝區中上一幀未使用的那一個
+            # （ROI可能是影像處理器緩衝區的視圖，保留到下一幀前需複製）
+            small_shape = (int(round(roi.shape[0] * self.flow_scale)),
+                           int(round(roi.shape[1] * self.flow_scale)))
+            small = self._flow_small_bufs[self._flow_small_idx]
+            if small is None or small.shape != small_shape:
+                small = np.empty(small_shape, dtype=np.uint8)
+                self._flow_small_bufs[self._flow_small_idx] = small
+            self._flow_small_idx ^= 1
+            
+            if self.flow_scale != 1.0:
+                cv2.resize(roi, (small_shape[1], small_shape[0]), small,
+                           interpolation=cv2.INTER_AREA)
+            else:
+                np.copyto(small, roi)
+            
+            prev_small = self._flow_prev_small
+            self._flow_prev_small = small
+            if prev_small is None or prev_small.shape != small.shape:
                 return 0.0
             
-            # 計算光流
-            flow = cv2.calcOpticalFlowPyrLK(
-                self.prev_frame, roi, None, None, **self.flow_params
+            # 計算稠密光流
+            flow = cv2.calcOpticalFlowFarneback(
+                prev_small, small,
+                self._get_scratch('flow', small_shape + (2,), np.float32),
+                **self.flow_params
             )
             
-            if flow[0] is not None:
-                # 計算光流向量的標準差
-                flow_vectors = flow[0]
-                if len(flow_vectors) > 0:
-                    # 計算速度大小
-                    flow_magnitude = np.sqrt(flow_vectors[:, :, 0]**2 + flow_vectors[:, :, 1]**2)
-                    
-                    # 計算不一致度（標準差）
-                    flow_inconsistency = np.std(flow_magnitude)
-                else:
-                    flow_inconsistency = 0.0
-            else:
-                flow_inconsistency = 0.0
-            
-            # 更新前一幀
-            self.prev_frame = roi.copy()
+            # 計算速度大小及其標準差（不一致度）
+            flow_magnitude = cv2.magnitude(flow[..., 0], flow[..., 1],
+                                           self._get_scratch('flow_magnitude', small_shape, np.float32))
+            _, std = cv2.meanStdDev(flow_magnitude)
+            flow_inconsistency = std[0, 0] / self.flow_scale
             
             return float(flow_inconsistency)
             
@@ -279,8 +708,9 @@ class FeatureExtractor:
     
     def reset_buffers(self):
         """重置緩衝區"""
-        self.frame_buffer.clear()
-        self.prev_frame = None
+        self._ring_head = 0
+        self._ring_count = 0
+        self._flow_prev_small = None
         self.logger.info("特徵提取器緩衝區已重置")
     
     def get_baseline_values(self) -> Dict[str, float]:
@@ -3,11 +3,94 @@
 負責影像前處理：CLAHE、直方圖匹配、ROI切割等
 """
 
+import os
 import cv2
 import numpy as np
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, List, Optional
 import logging
 
+from ..utils.jit import NUMBA_AVAILABLE, njit, register_warmup
+
+# CUDA版OpenCV（如Jetson）可用時，CLAHE改在GPU上執行
+try:
+    CUDA_AVAILABLE = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    CUDA_AVAILABLE = False
+
+@njit(cache=True, fastmath=True)
+def _build_match_lut(input_cdf, ref_cdf, out_lut):
+    """
+    以雙指標單調掃描建立直方圖匹配查找表
+    每個輸入灰階取CDF最接近的參考灰階，距離相同時取較小的灰階
+    
+    Args:
+        input_cdf: 輸入影像正規化CDF (256,)
+        ref_cdf: 參考影像正規化CDF (256,)
+        out_lut: 輸出查找表 (256,) uint8
+    """
+    n = ref_cdf.shape[0]
+    
+    # 參考CDF同值區段的第一個索引
+    first = np.empty(n, dtype=np.int64)
+    first[0] = 0
+    for k in range(1, n):
+        first[k] = first[k - 1] if ref_cdf[k] == ref_cdf[k - 1] else k
+    
+    j = 0
+    for i in range(input_cdf.shape[0]):
+        v = input_cdf[i]
+        # j為第一個 ref_cdf[j] >= v 的索引（v單調不減，j只前進）
+        while j < n and ref_cdf[j] < v:
+            j += 1
+        if j == 0:
+            out_lut[i] = 0
+        elif j == n:
+            out_lut[i] = first[n - 1]
+        else:
+            lower = first[j - 1]
+            if v - ref_cdf[lower] <= ref_cdf[j] - v:
+                out_lut[i] = lower
+            else:
+                out_lut[i] = j
+
+@register_warmup
+def _warmup_build_match_lut():
+    """預熱直方圖匹配查找表核心"""
+    cdf = np.linspace(0.0, 1.0, 256)
+    _build_match_lut(cdf, cdf, np.empty(256, dtype=np.uint8))
+
+def _opencl_requested(config: Dict) -> bool:
+    """
+    配置是否要求OpenCL前處理（環境變數 AQUA_FEEDER_OPENCL=0/1 可覆寫配置）
+    
+    Args:
+        config: 完整系統配置或其vision區段
+        
+    Returns:
+        是否要求使用OpenCL
+    """
+    config = config.get('vision', config)
+    use_opencl = config.get('preprocessing', {}).get('use_opencl', False)
+    env_opencl = os.environ.get('AQUA_FEEDER_OPENCL')
+    if env_opencl is not None:
+        use_opencl = env_opencl == '1'
+    return bool(use_opencl)
+
+def configure_opencl(config: Dict) -> bool:
+    """
+    依配置設定OpenCV的全域OpenCL開關，於節點啟動、建立ImageProcessor前呼叫一次
+    CUDA可用或裝置不支援OpenCL時關閉
+    
+    Args:
+        config: 完整系統配置或其vision區段
+        
+    Returns:
+        OpenCL是否啟用
+    """
+    enable = _opencl_requested(config) and not CUDA_AVAILABLE and cv2.ocl.haveOpenCL()
+    cv2.ocl.setUseOpenCL(enable)
+    return enable
+
 class ImageProcessor:
     """影像前處理器"""
     
@@ -16,23 +99,62 @@ class ImageProcessor:
         初始化影像處理器
         
         Args:
-            config: 配置字典，包含CLAHE、ROI等參數
+            config: 配置字典，包含CLAHE、ROI等參數（完整系統配置或其vision區段）
         """
+        # 完整系統配置的影像參數位於vision區段下
+        config = config.get('vision', config)
         self.config = config
         self.logger = logging.getLogger(__name__)
         
-        # 初始化CLAHE
+        # 調試模式才對整幀做增強（整幀影像只供調試影像使用）
+        self.debug_enable = config.get('preprocessing', {}).get('debug_enable', False)
+        # 調試影像的增強解析度比例（調試影像只供顯示，不需全解析度）
+        self.debug_scale = config.get('preprocessing', {}).get('debug_scale', 0.5)
+        
+        # 平坦的ROI（鏡頭遮蔽、全黑等）略過CLAHE，避免只放大雜訊
+        self.auto_skip_flat = config.get('preprocessing', {}).get('auto_skip_flat', True)
+        self.flat_std_threshold = config.get('preprocessing', {}).get('flat_std_threshold', 5.0)
+        self._flat_logged = set()  # 已記錄為平坦的ROI名稱，連續平坦時只記錄一次
+        
+        # 初始化CLAHE（CUDA可用時使用GPU版本）
         clahe_config = config.get('preprocessing', {}).get('clahe', {})
-        self.clahe = cv2.createCLAHE(
-            clipLimit=clahe_config.get('clip_limit', 2.0),
-            tileGridSize=tuple(clahe_config.get('tile_grid_size', [8, 8]))
-        )
+        clip_limit = clahe_config.get('clip_limit', 2.0)
+        tile_grid_size = tuple(clahe_config.get('tile_grid_size', [8, 8]))
+        self.use_cuda = CUDA_AVAILABLE
+        if self.use_cuda:
+            self.clahe = cv2.cuda.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+            # 依影像尺寸保留的GPU輸入/輸出緩衝區 {(高, 寬): (GpuMat, GpuMat)}
+            self._gpu_mats = {}
+            self.logger.info("使用CUDA CLAHE")
+        else:
+            self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+        
+        # OpenCL (UMat) 路徑：ROI的CLAHE在OpenCL裝置上執行
+        # OpenCV的全域OpenCL開關由節點啟動時的configure_opencl()設定，此處只讀取
+        self.use_opencl = (_opencl_requested(config) and not self.use_cuda
+                           and cv2.ocl.useOpenCL())
+        if self.use_opencl:
+            self.logger.info("使用OpenCL影像前處理")
+        
+        # ROI配置（複製一份，update_roi不會改動呼叫端的配置）
+        self.roi_config = {
+            name: dict(cfg) for name, cfg in config.get('roi_config', {}).items()
+        }
+        # 限制後的ROI邊界快取 {(高, 寬): [(名稱, y0, y1, x0, x1), ...]}，update_roi時清除
+        self._roi_cache = {}
+        self._rebuild_roi_table()
         
-        # ROI配置
-        self.roi_config = config.get('roi_config', {})
+        # 直方圖匹配參考圖像的正規化CDF（載入時計算一次）
+        self.reference_cdf = None
+        self._lut_buf = np.empty(256, dtype=np.uint8)
         
-        # 直方圖匹配參考圖像
-        self.reference_hist = None
+        # 跨幀重複使用的輸出緩衝區（首幀或影像尺寸改變時配置）
+        # 返回的影像與ROI為緩衝區視圖，下一幀會被覆寫，需保留者應自行複製
+        self._gray_buf = None
+        self._enh_buf = None
+        self._debug_small_buf = None
+        self._debug_small_enh_buf = None
+        self._roi_bufs = {}
         hist_config = config.get('preprocessing', {}).get('histogram_matching', {})
         if hist_config.get('enable', False):
             ref_path = hist_config.get('reference_image_path')
@@ -40,79 +162,234 @@ class ImageProcessor:
                 self._load_reference_histogram(ref_path)
     
     def _load_reference_histogram(self, image_path: str):
-        """載入參考圖像的直方圖"""
+        """載入參考圖像並計算其正規化CDF"""
         try:
             ref_img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
             if ref_img is not None:
-                self.reference_hist = cv2.calcHist([ref_img], [0], None, [256], [0, 256])
+                reference_hist = np.bincount(ref_img.ravel(), minlength=256)
+                ref_cdf = np.cumsum(reference_hist, dtype=np.float64)
+                self.reference_cdf = ref_cdf / ref_cdf[-1]  # 正規化
                 self.logger.info(f"載入參考直方圖: {image_path}")
             else:
                 self.logger.warning(f"無法載入參考圖像: {image_path}")
         except Exception as e:
             self.logger.error(f"載入參考直方圖失敗: {e}")
     
-    def preprocess_image(self, image: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    def preprocess_image(self, image: np.ndarray,
+                         copy_rois: bool = False) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
         """
         對輸入影像進行前處理
+        先切出ROI，CLAHE與直方圖匹配只作用於ROI像素；
+        整幀增強只在調試模式下執行
         
         Args:
             image: 輸入RGB影像
+            copy_rois: 返回獨立的ROI副本（預設返回重複使用的緩衝區，下一幀會被覆寫）
             
         Returns:
-            Tuple[處理後的灰度影像, ROI字典]
+            Tuple[灰度影像（調試模式為整幀增強結果）, 增強後的ROI字典]
         """
-        # 轉換為灰度
+        gray = self._to_gray(image)
+        
+        # 先切出ROI視圖，再逐一增強到各自的輸出緩衝區（平坦的ROI只複製）
+        rois = self._extract_rois(gray)
+        for name, roi in rois.items():
+            out = self._get_roi_buffer(name, roi.shape)
+            if self._is_flat(name, roi):
+                np.copyto(out, roi)
+                rois[name] = out
+            else:
+                rois[name] = self._enhance(roi, out)
+        
+        if copy_rois:
+            rois = {name: roi.copy() for name, roi in rois.items()}
+        
+        if not self.debug_enable:
+            return gray, rois
+        
+        # 調試模式：整幀增強供調試影像顯示
+        return self._enhance_debug_frame(gray), rois
+    
+    def _is_flat(self, roi_name: str, roi: np.ndarray) -> bool:
+        """
+        判斷ROI是否近乎均勻（灰度標準差低於閾值）
+        以每4行、每4列取樣估計標準差，只讀取約1/16的像素
+        
+        Args:
+            roi_name: ROI名稱
+            roi: ROI灰度影像
+            
+        Returns:
+            是否略過增強
+        """
+        if not self.auto_skip_flat:
+            return False
+        
+        std = cv2.meanStdDev(roi[::4, ::4])[1][0, 0]
+        if std >= self.flat_std_threshold:
+            self._flat_logged.discard(roi_name)
+            return False
+        
+        if roi_name not in self._flat_logged:
+            self.logger.warning(
+                f"{roi_name} 近乎均勻（標準差 {std:.2f} < {self.flat_std_threshold}），略過CLAHE增強"
+            )
+            self._flat_logged.add(roi_name)
+        return True
+    
+    def _to_gray(self, image: np.ndarray) -> np.ndarray:
+        """
+        轉換為灰度影像
+        
+        Args:
+            image: 輸入RGB或灰度影像
+            
+        Returns:
+            灰度影像（輸入已是灰度時直接返回）
+        """
+        self._ensure_frame_buffers(image.shape[:2])
+        
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image.copy()
+            return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, self._gray_buf)
         
-        # CLAHE增強
-        enhanced = self.clahe.apply(gray)
+        # CLAHE不修改輸入，灰度影像直接使用，不需複製
+        return image
+    
+    def _ensure_frame_buffers(self, frame_shape: Tuple[int, int]):
+        """首幀或影像尺寸改變時配置整幀緩衝區"""
+        if self._gray_buf is None or self._gray_buf.shape != frame_shape:
+            self._gray_buf = np.empty(frame_shape, dtype=np.uint8)
+            self._enh_buf = np.empty(frame_shape, dtype=np.uint8)
+            if self.debug_scale != 1.0:
+                small_shape = (max(1, round(frame_shape[0] * self.debug_scale)),
+                               max(1, round(frame_shape[1] * self.debug_scale)))
+                self._debug_small_buf = np.empty(small_shape, dtype=np.uint8)
+                self._debug_small_enh_buf = np.empty(small_shape, dtype=np.uint8)
+    
+    def _enhance_debug_frame(self, gray: np.ndarray) -> np.ndarray:
+        """
+        以調試解析度增強整幀，再以最近鄰放大回原尺寸
         
-        # 直方圖匹配（如果啟用）
-        if self.reference_hist is not None:
-            enhanced = self._histogram_matching(enhanced)
+        Args:
+            gray: 全解析度灰度影像
+            
+        Returns:
+            原尺寸的增強影像
+        """
+        if self.debug_scale == 1.0:
+            return self._enhance(gray, self._enh_buf)
+        
+        small_buf = self._debug_small_buf
+        small_size = (small_buf.shape[1], small_buf.shape[0])
+        small = cv2.resize(gray, small_size, small_buf, interpolation=cv2.INTER_AREA)
+        small_enh = self._enhance(small, self._debug_small_enh_buf)
         
-        # 提取ROI區域
-        rois = self._extract_rois(enhanced)
+        frame_size = (gray.shape[1], gray.shape[0])
+        return cv2.resize(small_enh, frame_size, self._enh_buf,
+                          interpolation=cv2.INTER_NEAREST)
+    
+    def _get_roi_buffer(self, roi_name: str, shape: Tuple[int, int]) -> np.ndarray:
+        """取得ROI的輸出緩衝區，尺寸改變時重新配置"""
+        buf = self._roi_bufs.get(roi_name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._roi_bufs[roi_name] = buf
+        return buf
+    
+    def _enhance(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        CLAHE增強，啟用時再原地做直方圖匹配
         
-        return enhanced, rois
+        Args:
+            image: 輸入灰度影像
+            out: 輸出緩衝區
+            
+        Returns:
+            增強後的影像（即out）
+        """
+        if self.use_cuda:
+            enhanced = self._apply_clahe_cuda(image, out)
+        elif self.use_opencl:
+            # 只上傳ROI為獨立UMat（CLAHE邊界與CPU路徑一致），結果只下載ROI大小
+            np.copyto(out, self.clahe.apply(cv2.UMat(image)).get())
+            enhanced = out
+        else:
+            enhanced = self.clahe.apply(image, out)
+        if self.reference_cdf is not None:
+            enhanced = self._histogram_matching(enhanced, enhanced)
+        return enhanced
     
-    def _histogram_matching(self, image: np.ndarray) -> np.ndarray:
+    def _apply_clahe_cuda(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        在GPU上執行CLAHE並下載到輸出緩衝區
+        
+        Args:
+            image: 輸入灰度影像
+            out: 輸出緩衝區
+            
+        Returns:
+            增強後的影像（即out）
+        """
+        mats = self._gpu_mats.get(image.shape)
+        if mats is None:
+            mats = (cv2.cuda_GpuMat(), cv2.cuda_GpuMat())
+            self._gpu_mats[image.shape] = mats
+        gpu_in, gpu_out = mats
+        
+        gpu_in.upload(image)
+        self.clahe.apply(gpu_in, cv2.cuda.Stream_Null(), gpu_out)
+        gpu_out.download(out)
+        return out
+    
+    def _histogram_matching(self, image: np.ndarray,
+                            out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         直方圖匹配到參考圖像
         
         Args:
             image: 輸入灰度影像
+            out: 輸出緩衝區（可與image相同，查找表逐像素映射可原地執行）
             
         Returns:
             匹配後的影像
         """
-        # 計算輸入影像直方圖
+        # 管線中的CLAHE輸出皆為C連續；轉置等非連續視圖先複製一次，
+        # 避免calcHist與LUT各自在內部轉換
+        if not image.flags['C_CONTIGUOUS']:
+            image = np.ascontiguousarray(image)
+        
+        # 計算輸入影像直方圖（每幀執行的熱路徑保留calcHist：
+        # 250x300 ROI上約36us，np.bincount約103us；參考直方圖只算一次才用bincount）
         input_hist = cv2.calcHist([image], [0], None, [256], [0, 256])
         
-        # 計算累積分布函數
-        input_cdf = np.cumsum(input_hist)
+        # 計算累積分布函數（與參考CDF同為float64）
+        input_cdf = np.cumsum(input_hist.ravel(), dtype=np.float64)
         input_cdf = input_cdf / input_cdf[-1]  # 正規化
         
-        ref_cdf = np.cumsum(self.reference_hist)
-        ref_cdf = ref_cdf / ref_cdf[-1]  # 正規化
+        ref_cdf = self.reference_cdf
         
-        # 建立查找表
-        lut = np.zeros(256, dtype=np.uint8)
-        for i in range(256):
-            # 找到最接近的參考CDF值
-            diff = np.abs(ref_cdf - input_cdf[i])
-            lut[i] = np.argmin(diff)
+        if NUMBA_AVAILABLE:
+            # 雙指標單調掃描，寫入預先配置的查找表
+            lut = self._lut_buf
+            _build_match_lut(input_cdf, ref_cdf, lut)
+        else:
+            # 建立查找表：兩條CDF皆單調，以二分搜尋找出最接近的參考CDF值
+            # ref_cdf[idx-1] < input_cdf <= ref_cdf[idx]，距離相同時取較小的灰階
+            idx = np.searchsorted(ref_cdf, input_cdf, side='left')
+            upper = np.minimum(idx, 255)
+            lower = np.searchsorted(ref_cdf, ref_cdf[np.maximum(idx - 1, 0)], side='left')
+            use_lower = (idx > 0) & (
+                (idx == 256) | (input_cdf - ref_cdf[lower] <= ref_cdf[upper] - input_cdf)
+            )
+            lut = np.where(use_lower, lower, upper).astype(np.uint8)
         
         # 應用查找表
-        matched = cv2.LUT(image, lut)
+        matched = cv2.LUT(image, lut, out)
         return matched
     
     def _extract_rois(self, image: np.ndarray) -> Dict[str, np.ndarray]:
         """
-        提取感興趣區域
+        提取感興趣區域（返回影像視圖，不複製）
         
         Args:
             image: 處理後的灰度影像
@@ -120,33 +397,57 @@ class ImageProcessor:
         Returns:
             ROI字典 {'roi_bub': array, 'roi_ring': array}
         """
-        rois = {}
+        bounds = self._roi_bounds(image.shape[:2])
+        return {name: image[y0:y1, x0:x1] for name, y0, y1, x0, x1 in bounds}
+    
+    def _roi_bounds(self, frame_size: Tuple[int, int]) -> List[Tuple[str, int, int, int, int]]:
+        """
+        獲取指定影像尺寸下各ROI的邊界（依尺寸快取）
         
-        # 提取氣泡檢測區域
-        if 'roi_bub' in self.roi_config:
-            bub_cfg = self.roi_config['roi_bub']
-            x, y = bub_cfg['x'], bub_cfg['y']
-            w, h = bub_cfg['width'], bub_cfg['height']
-            
-            # 確保ROI在影像範圍內
-            x = max(0, min(x, image.shape[1] - w))
-            y = max(0, min(y, image.shape[0] - h))
+        Args:
+            frame_size: (高, 寬)
             
-            rois['roi_bub'] = image[y:y+h, x:x+w]
+        Returns:
+            [(名稱, y0, y1, x0, x1), ...]
+        """
+        bounds = self._roi_cache.get(frame_size)
+        if bounds is None:
+            bounds = self._clamp_rois(*frame_size)
+            self._roi_cache[frame_size] = bounds
+        return bounds
+    
+    def _rebuild_roi_table(self):
+        """由ROI配置重建名稱列表與 (N, 4) [x, y, w, h] 矩形陣列"""
+        self._roi_names = list(self.roi_config)
+        self._roi_rects = np.array(
+            [[cfg['x'], cfg['y'], cfg['width'], cfg['height']]
+             for cfg in self.roi_config.values()],
+            dtype=np.int32
+        ).reshape(-1, 4)
+        self._roi_cache.clear()
+    
+    def _clamp_rois(self, height: int, width: int) -> List[Tuple[str, int, int, int, int]]:
+        """
+        一次計算所有ROI限制在影像範圍內的邊界
         
-        # 提取環狀波紋檢測區域
-        if 'roi_ring' in self.roi_config:
-            ring_cfg = self.roi_config['roi_ring']
-            x, y = ring_cfg['x'], ring_cfg['y']
-            w, h = ring_cfg['width'], ring_cfg['height']
-            
-            # 確保ROI在影像範圍內
-            x = max(0, min(x, image.shape[1] - w))
-            y = max(0, min(y, image.shape[0] - h))
+        Args:
+            height, width: 影像尺寸
             
-            rois['roi_ring'] = image[y:y+h, x:x+w]
+        Returns:
+            [(名稱, y0, y1, x0, x1), ...]
+        """
+        rects = self._roi_rects
+        size = rects[:, 2:]
+        
+        # 確保ROI在影像範圍內：左上角限制於 [0, 影像尺寸 - ROI尺寸]
+        upper = np.maximum(np.array([width, height]) - size, 0)
+        origin = np.clip(rects[:, :2], 0, upper)
+        end = origin + size
         
-        return rois
+        return [
+            (name, int(y0), int(y1), int(x0), int(x1))
+            for name, (x0, y0), (x1, y1) in zip(self._roi_names, origin, end)
+        ]
     
     def get_roi_coordinates(self, roi_name: str) -> Optional[Tuple[int, int, int, int]]:
         """
@@ -181,5 +482,6 @@ class ImageProcessor:
             'width': width,
             'height': height
         })
+        self._rebuild_roi_table()
         
         self.logger.info(f"更新ROI {roi_name}: ({x},{y}) {width}x{height}")
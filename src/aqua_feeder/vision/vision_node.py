@@ -10,19 +10,24 @@
 
 import rclpy
 from rclpy.node import Node
+from rclpy.logging import LoggingSeverity
+from rclpy.qos import QoSProfile, ReliabilityPolicy, HistoryPolicy
 from sensor_msgs.msg import Image
 from std_msgs.msg import Float32MultiArray, Header, String
 from cv_bridge import CvBridge
 import cv2
 import numpy as np
-import yaml
 import os
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Tuple
 
-from .image_processor import ImageProcessor
-from .feature_extractor import FeatureExtractor
+from .image_processor import ImageProcessor, configure_opencl
+from .feature_extractor import FeatureExtractor, FEAT_IDX
+from ..utils.jit import warmup_kernels
+from ..utils.config_cache import load_yaml_config
 
 class VisionNode(Node):
     """
@@ -41,12 +46,24 @@ class VisionNode(Node):
         
         # 初始化處理器
         vision_config = self.config.get('vision', {})
+        # OpenCV全域OpenCL開關於節點啟動時設定一次
+        configure_opencl(vision_config)
         self.image_processor = ImageProcessor(vision_config)
         self.feature_extractor = FeatureExtractor(self.config)
         
+        # 預熱JIT核心（有磁碟快取時直接載入），避免第一幀付出編譯時間
+        warmup_kernels()
+        
         # CV Bridge
         self.bridge = CvBridge()
         
+        # 影像話題QoS：盡力傳送且只保留最新一幀，處理落後時丟棄舊幀而非排隊
+        image_qos = QoSProfile(
+            reliability=ReliabilityPolicy.BEST_EFFORT,
+            history=HistoryPolicy.KEEP_LAST,
+            depth=1
+        )
+        
         # 發布者
         self.feature_publisher = self.create_publisher(
             Float32MultiArray, 
@@ -63,7 +80,7 @@ class VisionNode(Node):
         self.debug_image_publisher = self.create_publisher(
             Image,
             'aqua_feeder/debug_image',
-            10
+            image_qos
         )
         
         # 訂閱者
@@ -71,7 +88,7 @@ class VisionNode(Node):
             Image,
             'camera/image_raw',
             self.image_callback,
-            10
+            image_qos
         )
         
         # 計時器 - 用於定期發布狀態
@@ -79,7 +96,27 @@ class VisionNode(Node):
         
         # 狀態變數
         self.frame_count = 0
-        self.last_features = {}
+        self.dropped_frames = 0
+        self.last_features = None
+        
+        # 特徵向量緩衝區 [RSI, POP, FLOW, ME_ring, ME]，每幀原地寫入
+        self._feat_buf = np.zeros(len(FEAT_IDX), dtype=np.float32)
+        
+        # 處理管線：回調執行緒解碼下一幀時，工作執行緒處理上一幀；
+        # 調試影像的序列化與發布再交給另一個工作執行緒
+        self._pipeline = ThreadPoolExecutor(max_workers=2, thread_name_prefix='vision')
+        # 單槽待處理幀：工作執行緒忙碌時新幀取代尚未處理的舊幀，回調不阻塞
+        self._frame_lock = threading.Lock()
+        self._next_frame = None
+        self._worker_busy = False
+        self._pending_debug = None
+        
+        # 調試影像畫布（BGR），首次使用或尺寸改變時配置；
+        # 上一張調試影像發布完成前不會重畫，可安全重複使用
+        self._dbg_canvas = None
+        # ROI框繪製資料快取，ROI座標不變時重複使用
+        self._roi_overlay_key = None
+        self._roi_overlay = None
         
         self.logger.info("視覺處理節點初始化完成")
     
@@ -103,8 +140,7 @@ class VisionNode(Node):
                 self.logger.warning("找不到配置文件，使用預設配置")
                 return self._get_default_config()
             
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml_config(config_file)
                 
             self.logger.info(f"載入配置文件: {config_file}")
             return config
@@ -139,26 +175,62 @@ class VisionNode(Node):
         }
     
     def image_callback(self, msg):
-        """影像回調函數"""
+        """影像回調函數：解碼後放入待處理槽，不阻塞執行器"""
         try:
-            # 轉換ROS影像為OpenCV格式
+            # 轉換ROS影像為OpenCV格式（與上一幀的特徵提取重疊執行）
             cv_image = self.bridge.imgmsg_to_cv2(msg, "bgr8")
             
+            # 工作執行緒忙碌時以新幀取代尚未處理的舊幀，只處理最新一幀
+            with self._frame_lock:
+                if self._next_frame is not None:
+                    self.dropped_frames += 1
+                self._next_frame = (cv_image, msg.header)
+                if self._worker_busy:
+                    return
+                self._worker_busy = True
+            
+            self._pipeline.submit(self._drain_frames)
+            
+        except Exception as e:
+            self.logger.error(f"影像處理錯誤: {e}")
+    
+    def _drain_frames(self):
+        """工作執行緒：依序處理待處理槽中的最新幀，直到槽為空"""
+        while True:
+            with self._frame_lock:
+                frame = self._next_frame
+                self._next_frame = None
+                if frame is None:
+                    self._worker_busy = False
+                    return
+            self._process_frame(*frame)
+    
+    def _process_frame(self, cv_image, header):
+        """處理單幀：前處理、特徵提取與發布（於工作執行緒執行）"""
+        try:
             # 影像前處理
             processed_image, rois = self.image_processor.preprocess_image(cv_image)
             
             # 特徵提取
-            features = self.feature_extractor.extract_features(rois)
+            features = self.feature_extractor.extract_features(rois, out=self._feat_buf)
             
             # 發布特徵
-            self._publish_features(features, msg.header.stamp)
+            self._publish_features(features, header.stamp)
             
-            # 發布調試影像（如果啟用）
-            self._publish_debug_image(processed_image, rois, features, msg.header)
+            # 發布調試影像（有訂閱者時才建立，避免整幀轉換與序列化）
+            # 上一張仍在發布時略過本幀，調試影像不阻塞主處理
+            if (self.debug_image_publisher.get_subscription_count() > 0
+                    and (self._pending_debug is None or self._pending_debug.done())):
+                # 調試影像在此複製繪製，處理器緩衝區可立即供下一幀使用
+                debug_image = self._create_debug_image(processed_image, rois, features)
+                self._pending_debug = self._pipeline.submit(
+                    self._publish_debug_image, debug_image, header
+                )
             
             # 更新統計
             self.frame_count += 1
-            self.last_features = features
+            # 特徵緩衝區下一幀會被覆寫，狀態輸出使用不可變的快照
+            self.last_features = tuple(features.tolist())
             
         except Exception as e:
             self.logger.error(f"影像處理錯誤: {e}")
@@ -166,29 +238,28 @@ class VisionNode(Node):
     def _publish_features(self, features, timestamp):
         """發布特徵向量"""
         try:
+            # 特徵向量順序即為 [RSI, POP, FLOW, ME_ring, ME]
             msg = Float32MultiArray()
-            msg.data = [
-                float(features.get('RSI', 0.0)),
-                float(features.get('POP', 0.0)),
-                float(features.get('FLOW', 0.0)),
-                float(features.get('ME_ring', 0.0)),
-                float(features.get('ME', 0.0))
-            ]
+            msg.data = features.tolist()
             
             self.feature_publisher.publish(msg)
             
         except Exception as e:
             self.logger.error(f"特徵發布錯誤: {e}")
     
-    def _publish_debug_image(self, processed_image, rois, features, header):
+    def _publish_debug_image(self, debug_image, header):
         """發布調試影像"""
         try:
-            # 創建調試影像
-            debug_image = self._create_debug_image(processed_image, rois, features)
-            
-            # 轉換為ROS影像消息
-            debug_msg = self.bridge.cv2_to_imgmsg(debug_image, "bgr8")
+            # 直接組裝ROS影像消息（調試影像為C連續的BGR影像），省去cv_bridge的中間複製
+            height, width = debug_image.shape[:2]
+            debug_msg = Image()
             debug_msg.header = header
+            debug_msg.height = height
+            debug_msg.width = width
+            debug_msg.encoding = 'bgr8'
+            debug_msg.is_bigendian = 0
+            debug_msg.step = width * 3
+            debug_msg.data = debug_image.tobytes()
             
             self.debug_image_publisher.publish(debug_msg)
             
@@ -196,39 +267,79 @@ class VisionNode(Node):
             self.logger.error(f"調試影像發布錯誤: {e}")
     
     def _create_debug_image(self, processed_image, rois, features):
-        """創建調試影像"""
-        # 轉換為彩色影像
+        """創建調試影像（繪製於重複使用的畫布上）"""
+        canvas_shape = processed_image.shape[:2] + (3,)
+        if self._dbg_canvas is None or self._dbg_canvas.shape != canvas_shape:
+            self._dbg_canvas = np.empty(canvas_shape, dtype=np.uint8)
+        debug_image = self._dbg_canvas
+        
+        # 轉換為彩色影像，直接寫入畫布
         if len(processed_image.shape) == 2:
-            debug_image = cv2.cvtColor(processed_image, cv2.COLOR_GRAY2BGR)
+            cv2.cvtColor(processed_image, cv2.COLOR_GRAY2BGR, debug_image)
         else:
-            debug_image = processed_image.copy()
-        
-        # 繪製ROI框
-        for roi_name in ['roi_bub', 'roi_ring']:
-            coords = self.image_processor.get_roi_coordinates(roi_name)
-            if coords:
-                x, y, w, h = coords
-                color = (0, 255, 0) if roi_name == 'roi_bub' else (0, 0, 255)
-                cv2.rectangle(debug_image, (x, y), (x + w, y + h), color, 2)
-                cv2.putText(debug_image, roi_name, (x, y - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            np.copyto(debug_image, processed_image)
+        
+        # 繪製ROI框：同色的框以單次polylines繪製
+        contour_groups, labels = self._get_roi_overlay()
+        for color, contours in contour_groups:
+            cv2.polylines(debug_image, contours, True, color, 2)
+        for roi_name, position, color in labels:
+            cv2.putText(debug_image, roi_name, position,
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
         
         # 添加特徵信息
         y_offset = 30
-        for feature_name, value in features.items():
-            text = f"{feature_name}: {value:.3f}"
+        for feature_name, idx in FEAT_IDX.items():
+            text = f"{feature_name}: {features[idx]:.3f}"
             cv2.putText(debug_image, text, (10, y_offset),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
             y_offset += 25
         
         return debug_image
     
+    def _get_roi_overlay(self):
+        """
+        獲取ROI框繪製資料，ROI座標改變時才重建
+        
+        Returns:
+            ([(顏色, [輪廓, ...]), ...], [(ROI名稱, 標籤位置, 顏色), ...])
+        """
+        roi_names = ('roi_bub', 'roi_ring')
+        key = tuple(self.image_processor.get_roi_coordinates(name) for name in roi_names)
+        if key != self._roi_overlay_key:
+            groups = {}
+            labels = []
+            for roi_name, coords in zip(roi_names, key):
+                if coords:
+                    x, y, w, h = coords
+                    color = (0, 255, 0) if roi_name == 'roi_bub' else (0, 0, 255)
+                    contour = np.array(
+                        [[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.int32
+                    ).reshape(-1, 1, 2)
+                    groups.setdefault(color, []).append(contour)
+                    labels.append((roi_name, (x, y - 10), color))
+            
+            self._roi_overlay = (list(groups.items()), labels)
+            self._roi_overlay_key = key
+        
+        return self._roi_overlay
+    
     def publish_status(self):
         """發布節點狀態"""
-        self.logger.info(f"視覺節點運行中 - 處理幀數: {self.frame_count}")
-        if self.last_features:
-            feature_str = ", ".join([f"{k}:{v:.3f}" for k, v in self.last_features.items()])
+        # 狀態計時器每秒觸發，運行資訊每5秒輸出一次
+        self.logger.info(f"視覺節點運行中 - 處理幀數: {self.frame_count}, "
+                         f"略過幀數: {self.dropped_frames}",
+                         throttle_duration_sec=5.0)
+        # 只在啟用除錯等級時才格式化特徵字串
+        if (self.last_features is not None
+                and self.logger.is_enabled_for(LoggingSeverity.DEBUG)):
+            feature_str = ", ".join([f"{k}:{self.last_features[i]:.3f}" for k, i in FEAT_IDX.items()])
             self.logger.debug(f"最新特徵: {feature_str}")
+    
+    def destroy_node(self):
+        """關閉處理管線後銷毀節點"""
+        self._pipeline.shutdown(wait=True)
+        super().destroy_node()
 
 def main(args=None):
     """主函數"""
@@ -6,6 +6,7 @@
 
 import os
 import sys
+import importlib.util
 import yaml
 import logging
 import subprocess
@@ -29,11 +30,11 @@ def check_system_requirements():
         'cv2', 'numpy', 'scipy', 'yaml', 'matplotlib'
     ]
     
+    # 只檢查是否安裝，不執行模組載入（matplotlib等載入耗時）
     for package in required_packages:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(package) is not None:
             print(f"✅ {package} 已安裝")
-        except ImportError:
+        else:
             issues.append(f"缺少Python包: {package}")
     
     # 檢查Jetson GPIO (僅在Jetson平台)
@@ -58,9 +59,12 @@ def check_hardware():
         import cv2
         cap = cv2.VideoCapture(0)
         if cap.isOpened():
-            ret, frame = cap.read()
+            # 只抓取幀而不解碼（省去retrieve的格式轉換），解析度由屬性讀取
+            ret = cap.grab()
             if ret:
-                print(f"✅ 相機正常 - 解析度: {frame.shape}")
+                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                print(f"✅ 相機正常 - 解析度: {width}x{height}")
                 hardware_status['camera'] = True
             else:
                 print("❌ 相機無法讀取影像")
@@ -8,6 +8,8 @@ GUI測試腳本 - 測試GUI組件是否正常工作
 
 import sys
 import os
+import importlib.util
+from importlib import metadata
 from pathlib import Path
 
 # 添加項目路徑
@@ -18,27 +20,21 @@ def test_imports():
     """測試模塊導入"""
     print("測試模塊導入...")
     
-    try:
-        import tkinter as tk
-        print("✓ tkinter 導入成功")
-    except ImportError as e:
-        print(f"✗ tkinter 導入失敗: {e}")
-        return False
-        
-    try:
-        import numpy as np
-        print(f"✓ numpy 導入成功 (版本: {np.__version__})")
-    except ImportError as e:
-        print(f"✗ numpy 導入失敗: {e}")
-        return False
-        
-    try:
-        import matplotlib.pyplot as plt
-        import matplotlib
-        print(f"✓ matplotlib 導入成功 (版本: {matplotlib.__version__})")
-    except ImportError as e:
-        print(f"✗ matplotlib 導入失敗: {e}")
+    # 只檢查模組是否可找到，不執行載入；版本號從套件資訊讀取
+    if importlib.util.find_spec('tkinter') is None:
+        print("✗ tkinter 導入失敗: 找不到模組")
         return False
+    print("✓ tkinter 導入成功")
+    
+    for package in ('numpy', 'matplotlib'):
+        if importlib.util.find_spec(package) is None:
+            print(f"✗ {package} 導入失敗: 找不到模組")
+            return False
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = "未知"
+        print(f"✓ {package} 導入成功 (版本: {version})")
         
     return True
 
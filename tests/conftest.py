@@ -0,0 +1,53 @@
+"""
+pytest共用設定
+依pytest-xdist工作程序數分配OpenCV執行緒，避免多程序同時佔滿所有核心
+"""
+
+import os
+
+# 須在匯入numpy/cv2之前設定，OpenMP執行緒池於載入時建立
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+import cv2
+import pytest
+
+
+def pytest_configure(config):
+    """註冊自訂標記"""
+    config.addinivalue_line(
+        "markers", "serial: 需獨佔全部核心的測試，不在xdist工作程序中執行"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """在xdist工作程序中略過serial測試，避免與其他程序搶奪核心"""
+    if 'PYTEST_XDIST_WORKER' not in os.environ:
+        return
+    skip_serial = pytest.mark.skip(reason="serial測試請單獨執行: pytest -m serial")
+    for item in items:
+        if 'serial' in item.keywords:
+            item.add_marker(skip_serial)
+
+
+def _threads_per_worker() -> int:
+    """每個測試程序可用的OpenCV執行緒數（未使用xdist時為全部核心）"""
+    workers = int(os.environ.get('PYTEST_XDIST_WORKER_COUNT', '1'))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _cv_thread_pool():
+    """測試階段開始時設定OpenCV執行緒數，結束後還原"""
+    previous = cv2.getNumThreads()
+    cv2.setNumThreads(_threads_per_worker())
+    yield
+    cv2.setNumThreads(previous)
+
+
+@pytest.fixture
+def cv_all_threads():
+    """性能測試單獨執行時使用全部核心"""
+    previous = cv2.getNumThreads()
+    cv2.setNumThreads(os.cpu_count() or 1)
+    yield
+    cv2.setNumThreads(previous)
@@ -5,44 +5,233 @@
 
 import pytest
 import numpy as np
+import pandas as pd
 import cv2
-import yaml
+import gc
 import os
-import sys
 import time
+from types import MappingProxyType
 
-# 添加專案路徑
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
-
+from aqua_feeder.vision import image_processor as image_processor_module
 from aqua_feeder.vision.image_processor import ImageProcessor
-from aqua_feeder.vision.feature_extractor import FeatureExtractor
+from aqua_feeder.vision.feature_extractor import FeatureExtractor, FEAT_IDX, NUMBA_AVAILABLE
 from aqua_feeder.control.pi_controller import PIController
 from aqua_feeder.control.feeding_controller import FeedingController
+from aqua_feeder.validation.system_validator import SystemValidator
+from aqua_feeder.utils.config_cache import load_yaml_config
+from aqua_feeder.utils import system_monitor
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'system_params.yaml')
+
+
+def _freeze(value):
+    """遞迴將配置轉為唯讀（dict→MappingProxyType、list→tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# 測試共用的系統配置（唯讀，所有測試共用同一份，不會被受測物件改動）
+SYSTEM_CONFIG = _freeze({
+    'vision': {
+        'roi_config': {
+            'roi_bub': {'x': 100, 'y': 100, 'width': 200, 'height': 150},
+            'roi_ring': {'x': 50, 'y': 50, 'width': 300, 'height': 250}
+        },
+        'preprocessing': {
+            'clahe': {'clip_limit': 2.0, 'tile_grid_size': [8, 8]},
+            'histogram_matching': {'enable': False}
+        },
+        'feature_extraction': {
+            'motion_energy': {'temporal_window': 5, 'threshold': 15},
+            'ripple_spectral': {'high_freq_start': 0.3, 'low_freq_end': 0.1},
+            'bubble_pop': {'min_area': 50, 'max_area': 500, 'circularity_threshold': 0.7},
+            'optical_flow': {'pyramid_levels': 3, 'window_size': 15}
+        }
+    },
+    'feature_fusion': {
+        'weights': {'alpha': 0.4, 'beta': 0.3, 'gamma': 0.2, 'delta': 0.1},
+        'baseline': {'ME0': 10.0, 'RSI0': 0.2},
+        'normalization': {'RSI_max': 2.0, 'POP_max': 10.0, 'FLOW_max': 100.0, 'ME_max': 50.0}
+    },
+    'controller': {
+        'timing': {'t_feed': 0.6, 't_eval': 3.0, 't_settle': 1.0},
+        'thresholds': {'H_hi': 0.65, 'H_lo': 0.35},
+        'pi_controller': {'Kp': 15.0, 'Ki': 2.0},
+        'constraints': {'delta_up': 10.0, 'delta_down': 15.0},
+        'anti_windup': {'enable': True, 'max_integral': 50.0}
+    },
+    'hardware': {
+        'pwm': {'min_duty_cycle': 20, 'max_duty_cycle': 70}
+    },
+    'anomaly_detection': {
+        'fps_threshold': 50,
+        'low_activity_duration': 30,
+        'fallback_mode': {'pwm_safe_value': 30, 'evaluation_extension': 2.0}
+    }
+})
+
+
+@pytest.fixture(scope="session")
+def system_config():
+    """系統配置（整個測試階段只解析一次），找不到配置文件時為None"""
+    if not os.path.exists(CONFIG_PATH):
+        return None
+    return load_yaml_config(CONFIG_PATH)
+
+
+@pytest.fixture(scope="module")
+def rand_frame():
+    """共用的隨機測試影像（整個模組只產生一次）"""
+    return _rand_frame((480, 640, 3), np.random.default_rng(0))
+
+
+def _rand_frame(shape, rng):
+    """
+    產生隨機uint8影像（直接取亂數位元組，不逐元素做範圍取樣）
+    
+    Args:
+        shape: 影像尺寸
+        rng: numpy.random.Generator
+        
+    Returns:
+        可寫入的uint8影像
+    """
+    return np.frombuffer(bytearray(rng.bytes(int(np.prod(shape)))), dtype=np.uint8).reshape(shape)
+
+
+def _hist_cdf(hist):
+    """由直方圖計算正規化CDF（與影像處理器相同的float64計算）"""
+    cdf = np.cumsum(np.asarray(hist, dtype=np.float64))
+    return cdf / cdf[-1]
+
+
+def _argmin_lut(input_cdf, ref_cdf):
+    """原始的逐灰階argmin查找表建立方式（測試基準）"""
+    lut = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        lut[i] = np.argmin(np.abs(ref_cdf - input_cdf[i]))
+    return lut
+
+
+def _lut_cases():
+    """直方圖匹配查找表的測試CDF組合：隨機、含平台、距離相同"""
+    rng = np.random.default_rng(5)
+    cases = []
+    for _ in range(20):
+        # 稠密直方圖
+        cases.append((rng.integers(1, 1000, 256), rng.integers(1, 1000, 256)))
+        # 稀疏直方圖：大量空灰階使CDF出現平台
+        cases.append((rng.integers(0, 1000, 256) * (rng.random(256) < 0.1),
+                      rng.integers(0, 1000, 256) * (rng.random(256) < 0.1)))
+    for cdf_pair in list(cases):
+        for hist in cdf_pair:
+            hist[rng.integers(256)] += 1  # 確保總數非零
+    # 距離相同：參考CDF為k/4的平台，輸入CDF為(i+1)/256，兩者皆為精確的二進位小數
+    ref_hist = np.zeros(256, dtype=np.int64)
+    ref_hist[[0, 64, 128, 192]] = 64
+    cases.append((np.ones(256, dtype=np.int64), ref_hist))
+    # 參考影像前段全空，輸入集中在低灰階
+    ref_hist = np.zeros(256, dtype=np.int64)
+    ref_hist[200:] = 1
+    input_hist = np.zeros(256, dtype=np.int64)
+    input_hist[:3] = [1000, 1, 1]
+    cases.append((input_hist, ref_hist))
+    return cases
+
+
+def _fftshift_rsi(roi, high_freq_start=0.3, low_freq_end=0.1):
+    """原始以完整fft2加fftshift計算的RSI（測試基準）"""
+    magnitude = np.abs(np.fft.fftshift(np.fft.fft2(roi.astype(np.float64))))
+    rows, cols = roi.shape
+    center_row, center_col = rows // 2, cols // 2
+    y, x = np.ogrid[:rows, :cols]
+    distance = np.sqrt((x - center_col)**2 + (y - center_row)**2) / min(center_row, center_col)
+    high = np.sum(magnitude[distance >= high_freq_start]**2)
+    low = np.sum(magnitude[distance <= low_freq_end]**2)
+    return high / low
+
+
+def _ripple_roi(shape, rng):
+    """同心圓波紋加雜訊的合成ROI"""
+    rows, cols = shape
+    y, x = np.ogrid[:rows, :cols]
+    r = np.hypot(y - rows * 0.4, x - cols * 0.6)
+    ripple = 100 + 60 * np.cos(r * 0.9) * np.exp(-r / 80) + rng.normal(0, 4, shape)
+    return np.clip(ripple, 0, 255).astype(np.uint8)
+
+
+def _make_translated_pair(shape=(250, 300), shift=(2, 2)):
+    """
+    產生平移k像素的平滑紋理影像對，模擬真實的相鄰幀
+    （白噪音會讓光流金字塔跑滿迭代，無法反映實際運算路徑）
+    
+    Returns:
+        (前一幀, 平移後的幀)
+    """
+    img = _rand_frame(shape, np.random.default_rng(1))
+    img = cv2.GaussianBlur(img, (0, 0), 3)
+    cv2.normalize(img, img, 0, 255, cv2.NORM_MINMAX)
+    return img, np.roll(img, shift=shift, axis=(0, 1))
+
+
+@pytest.fixture(scope="module")
+def translated_pair():
+    """共用的平移影像對ROI（整個模組只產生一次）"""
+    prev, curr = _make_translated_pair()
+    return (
+        {'roi_bub': prev[:150, :200], 'roi_ring': prev},
+        {'roi_bub': curr[:150, :200], 'roi_ring': curr}
+    )
+
+
+@pytest.fixture(scope="module")
+def image_processor():
+    """模組共用的影像處理器（無跨幀狀態）"""
+    return ImageProcessor(SYSTEM_CONFIG)
+
+
+@pytest.fixture(scope="module")
+def _shared_feature_extractor():
+    """模組內只建立一次的特徵提取器"""
+    return FeatureExtractor(SYSTEM_CONFIG)
+
+
+@pytest.fixture
+def feature_extractor(_shared_feature_extractor):
+    """模組共用的特徵提取器，每個測試前清空歷史幀"""
+    _shared_feature_extractor.reset_buffers()
+    return _shared_feature_extractor
+
+
+@pytest.fixture(scope="module")
+def _shared_feeding_controller():
+    """模組內只建立一次的餵料控制器"""
+    return FeedingController(SYSTEM_CONFIG)
+
+
+@pytest.fixture
+def feeding_controller(_shared_feeding_controller):
+    """模組共用的餵料控制器，每個測試前重置狀態"""
+    _shared_feeding_controller.reset()
+    return _shared_feeding_controller
 
 
 class TestImageProcessor:
     """測試影像處理器"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _setup(self, image_processor):
         """測試設定"""
-        self.config = {
-            'vision': {
-                'roi_config': {
-                    'roi_bub': {'x': 100, 'y': 100, 'width': 200, 'height': 150},
-                    'roi_ring': {'x': 50, 'y': 50, 'width': 300, 'height': 250}
-                },
-                'preprocessing': {
-                    'clahe': {'clip_limit': 2.0, 'tile_grid_size': [8, 8]},
-                    'histogram_matching': {'enable': False}
-                }
-            }
-        }
-        self.processor = ImageProcessor(self.config)
+        self.processor = image_processor
     
-    def test_preprocess_image(self):
+    def test_preprocess_image(self, rand_frame):
         """測試影像前處理"""
-        # 創建測試影像
-        test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        # 測試影像
+        test_image = rand_frame
         
         # 處理影像
         processed_image, rois = self.processor.preprocess_image(test_image)
@@ -55,6 +244,68 @@ class TestImageProcessor:
         assert rois['roi_bub'].shape == (150, 200)  # 高, 寬
         assert rois['roi_ring'].shape == (250, 300)
     
+    def test_roi_buffers_reused(self, rand_frame):
+        """測試ROI緩衝區跨幀重複使用，copy_rois時返回獨立副本"""
+        test_image = rand_frame
+        
+        _, rois = self.processor.preprocess_image(test_image)
+        _, rois_next = self.processor.preprocess_image(test_image)
+        assert np.shares_memory(rois['roi_bub'], rois_next['roi_bub'])
+        
+        _, copied = self.processor.preprocess_image(test_image, copy_rois=True)
+        assert not np.shares_memory(copied['roi_bub'], rois_next['roi_bub'])
+        np.testing.assert_array_equal(copied['roi_bub'], rois_next['roi_bub'])
+    
+    def test_flat_frame_skips_enhancement(self):
+        """測試近乎均勻的畫面略過CLAHE，ROI等於原始灰度"""
+        rng = np.random.default_rng(2)
+        flat_image = (100 + rng.integers(-2, 3, (480, 640, 3))).astype(np.uint8)
+        gray = cv2.cvtColor(flat_image, cv2.COLOR_BGR2GRAY)
+        
+        processor = ImageProcessor(SYSTEM_CONFIG)
+        applied = []
+        clahe = processor.clahe
+        processor.clahe = type('SpyCLAHE', (), {
+            'apply': lambda _, *args: applied.append(1) or clahe.apply(*args)
+        })()
+        
+        _, rois = processor.preprocess_image(flat_image)
+        
+        assert not applied
+        np.testing.assert_array_equal(rois['roi_bub'], gray[100:250, 100:300])
+        np.testing.assert_array_equal(rois['roi_ring'], gray[50:300, 50:350])
+        
+        # 關閉略過時同一畫面會被CLAHE拉伸
+        processor.auto_skip_flat = False
+        _, rois = processor.preprocess_image(flat_image)
+        assert applied
+        assert not np.array_equal(rois['roi_bub'], gray[100:250, 100:300])
+    
+    @pytest.mark.parametrize('use_numba', [True, False])
+    def test_match_lut_equals_argmin(self, monkeypatch, use_numba):
+        """測試直方圖匹配查找表（numba核心與searchsorted備援）與原始argmin建表一致"""
+        if use_numba and not image_processor_module.NUMBA_AVAILABLE:
+            pytest.skip("numba不可用")
+        monkeypatch.setattr(image_processor_module, 'NUMBA_AVAILABLE', use_numba)
+        
+        processor = ImageProcessor(SYSTEM_CONFIG)
+        
+        for input_hist, ref_hist in _lut_cases():
+            input_cdf = _hist_cdf(input_hist)
+            ref_cdf = _hist_cdf(ref_hist)
+            expected = _argmin_lut(input_cdf, ref_cdf)
+            
+            if use_numba:
+                lut = np.empty(256, dtype=np.uint8)
+                image_processor_module._build_match_lut(input_cdf, ref_cdf, lut)
+                assert np.array_equal(lut, expected)
+            
+            # 直方圖恰為input_hist的影像，經_histogram_matching後逐像素比對查找表
+            image = np.repeat(np.arange(256, dtype=np.uint8), input_hist)[np.newaxis, :]
+            processor.reference_cdf = ref_cdf
+            matched = processor._histogram_matching(image)
+            assert np.array_equal(matched.ravel(), expected[image.ravel()])
+    
     def test_roi_coordinates(self):
         """測試ROI座標獲取"""
         coords = self.processor.get_roi_coordinates('roi_bub')
@@ -68,32 +319,16 @@ class TestImageProcessor:
 class TestFeatureExtractor:
     """測試特徵提取器"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _setup(self, feature_extractor):
         """測試設定"""
-        self.config = {
-            'feature_extraction': {
-                'motion_energy': {'temporal_window': 5, 'threshold': 15},
-                'ripple_spectral': {'high_freq_start': 0.3, 'low_freq_end': 0.1},
-                'bubble_pop': {'min_area': 50, 'max_area': 500, 'circularity_threshold': 0.7},
-                'optical_flow': {'pyramid_levels': 3, 'window_size': 15}
-            },
-            'feature_fusion': {
-                'baseline': {'ME0': 10.0, 'RSI0': 0.2},
-                'normalization': {'RSI_max': 2.0, 'POP_max': 10.0, 'FLOW_max': 100.0, 'ME_max': 50.0}
-            }
-        }
-        self.extractor = FeatureExtractor(self.config)
+        self.extractor = feature_extractor
     
-    def test_extract_features(self):
+    def test_extract_features(self, translated_pair):
         """測試特徵提取"""
-        # 創建測試ROI
-        roi_bub = np.random.randint(0, 255, (150, 200), dtype=np.uint8)
-        roi_ring = np.random.randint(0, 255, (250, 300), dtype=np.uint8)
-        
-        rois = {
-            'roi_bub': roi_bub,
-            'roi_ring': roi_ring
-        }
+        # 平移影像對：第一幀建立歷史，第二幀計算光流與運動能量
+        prev_rois, rois = translated_pair
+        self.extractor.extract_features(prev_rois)
         
         # 提取特徵
         features = self.extractor.extract_features(rois)
@@ -101,9 +336,50 @@ class TestFeatureExtractor:
         # 驗證結果
         expected_features = ['ME', 'RSI', 'POP', 'FLOW', 'ME_ring']
         for feature in expected_features:
-            assert feature in features
-            assert isinstance(features[feature], (int, float))
-            assert features[feature] >= 0  # 所有特徵應為非負值
+            assert hasattr(features, feature)
+            value = getattr(features, feature)
+            assert isinstance(value, (int, float))
+            assert value >= 0  # 所有特徵應為非負值
+    
+    @pytest.mark.skipif(not NUMBA_AVAILABLE, reason="融合核心需要numba")
+    @pytest.mark.parametrize('shape', [(250, 300), (37, 53), (3, 40)])
+    def test_fused_matches_unfused(self, translated_pair, shape):
+        """測試spatial模式的ME/RSI融合核心與分開計算的結果一致"""
+        config = {'feature_extraction': {'ripple_spectral': {'method': 'spatial'}}}
+        fused = FeatureExtractor(config)
+        unfused = FeatureExtractor(config)
+        unfused.fused_spatial = False
+        assert fused.fused_spatial
+        
+        rows, cols = shape
+        for rois in translated_pair:
+            roi = {'roi_ring': rois['roi_ring'][:rows, :cols]}
+            result = fused.extract_features(roi)
+            expected = unfused.extract_features(roi)
+        
+        assert result.ME == expected.ME
+        assert result.RSI == pytest.approx(expected.RSI, rel=1e-5)
+    
+    @pytest.mark.parametrize('shape', [(250, 300), (151, 201), (64, 47)])
+    def test_rsi_matches_fftshift_baseline(self, shape):
+        """測試rfft2半頻譜加鏡像索引的RSI與完整fft2加fftshift的結果一致"""
+        rng = np.random.default_rng(7)
+        for roi in (_rand_frame(shape, rng), _ripple_roi(shape, rng)):
+            rsi = self.extractor._extract_ripple_spectral_index(roi)
+            assert rsi == pytest.approx(_fftshift_rsi(roi), rel=1e-4)
+    
+    def test_extract_features_out_matches_feat_idx(self, translated_pair):
+        """測試寫入out緩衝區的特徵依FEAT_IDX排列，與Features欄位一致"""
+        out = np.zeros(len(FEAT_IDX), dtype=np.float32)
+        for rois in translated_pair:
+            self.extractor.extract_features(rois, out=out)
+        
+        self.extractor.reset_buffers()
+        for rois in translated_pair:
+            features = self.extractor.extract_features(rois)
+        
+        for name, idx in FEAT_IDX.items():
+            assert out[idx] == pytest.approx(getattr(features, name), rel=1e-5)
     
     def test_baseline_values(self):
         """測試基線值"""
@@ -163,31 +439,10 @@ class TestPIController:
 class TestFeedingController:
     """測試餵料控制器"""
     
-    def setup_method(self):
+    @pytest.fixture(autouse=True)
+    def _setup(self, feeding_controller):
         """測試設定"""
-        self.config = {
-            'controller': {
-                'timing': {'t_feed': 0.6, 't_eval': 3.0, 't_settle': 1.0},
-                'thresholds': {'H_hi': 0.65, 'H_lo': 0.35},
-                'pi_controller': {'Kp': 15.0, 'Ki': 2.0},
-                'constraints': {'delta_up': 10.0, 'delta_down': 15.0},
-                'anti_windup': {'enable': True, 'max_integral': 50.0}
-            },
-            'feature_fusion': {
-                'weights': {'alpha': 0.4, 'beta': 0.3, 'gamma': 0.2, 'delta': 0.1},
-                'baseline': {'ME0': 10.0, 'RSI0': 0.2},
-                'normalization': {'RSI_max': 2.0, 'POP_max': 10.0, 'FLOW_max': 100.0, 'ME_max': 50.0}
-            },
-            'hardware': {
-                'pwm': {'min_duty_cycle': 20, 'max_duty_cycle': 70}
-            },
-            'anomaly_detection': {
-                'fps_threshold': 50,
-                'low_activity_duration': 30,
-                'fallback_mode': {'pwm_safe_value': 30, 'evaluation_extension': 2.0}
-            }
-        }
-        self.controller = FeedingController(self.config)
+        self.controller = feeding_controller
     
     def test_activity_calculation(self):
         """測試活躍度計算"""
@@ -234,68 +489,166 @@ class TestFeedingController:
         assert status['state'] == '初始化'
 
 
+class TestSystemValidator:
+    """測試系統驗證器"""
+    
+    def setup_method(self):
+        """測試設定"""
+        self.validator = SystemValidator(CONFIG_PATH)
+    
+    def _write_log(self, path, rows=600):
+        """產生模擬日誌CSV"""
+        rng = np.random.default_rng(0)
+        states = ['評估中', '餵食中', '餵食中', '穩定等待', '異常模式']
+        start = np.datetime64('2024-08-25T00:00:00')
+        offsets = np.cumsum(rng.uniform(0.2, 1.5, rows))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('timestamp,state,pwm,H,RSI,POP,FLOW,ME_ring,warnings\n')
+            for i in range(rows):
+                ts = start + np.timedelta64(int(offsets[i] * 1e6), 'us')
+                f.write(f"{ts},{states[rng.integers(len(states))]},{rng.uniform(20, 70):.2f},"
+                        f"{rng.uniform(0, 1):.4f},0,0,0,0,\n")
+    
+    def test_streaming_matches_in_memory(self, tmp_path):
+        """測試分段串流驗證與整份載入的結果一致"""
+        log_file = str(tmp_path / 'feeding_log.csv')
+        self._write_log(log_file)
+        
+        expected = {
+            'correlation': self.validator.validate_correlation(log_file),
+            'pwm_oscillation': self.validator.validate_pwm_oscillation(log_file),
+            'response_time': self.validator.validate_response_time(log_file),
+            'hit_rate': self.validator.validate_disappearance_hit_rate(log_file)
+        }
+        results, plot_df = self.validator._validate_streaming(log_file, chunk_rows=20)
+        
+        for name, expected_result in expected.items():
+            assert results[name]['status'] == expected_result['status']
+            for key, value in expected_result.items():
+                if key in ('status', 'timestamp', 'message', 'target_range'):
+                    continue
+                assert np.allclose(results[name][key], value, rtol=1e-6)
+        assert len(plot_df) == 600
+    
+    def test_dataframe_input_not_modified(self, tmp_path):
+        """測試傳入DataFrame時驗證不修改呼叫端的資料"""
+        log_file = str(tmp_path / 'feeding_log.csv')
+        self._write_log(log_file)
+        df = pd.read_csv(log_file)
+        original = df.copy()
+        
+        self.validator.validate_response_time(df)
+        self.validator.validate_disappearance_hit_rate(df)
+        
+        pd.testing.assert_frame_equal(df, original)
+
+
+class TestSystemMonitor:
+    """測試系統監控器"""
+    
+    NET_DEV = (
+        "Inter-|   Receive                                                |  Transmit\n"
+        " face |bytes    packets errs drop fifo frame compressed multicast|"
+        "bytes    packets errs drop fifo colls carrier compressed\n"
+        "    lo:    1000      10    0    0    0     0          0         0"
+        "     1000      10    0    0    0     0       0          0\n"
+        "  eth0: 5000 50 0 0 0 0 0 0 7000 70 0 0 0 0 0 0\n"
+    )
+    
+    @pytest.fixture
+    def proc_dir(self, tmp_path, monkeypatch):
+        """以測試用的/proc內容取代系統檔案"""
+        paths = {name: tmp_path / name for name in ('stat', 'meminfo', 'net_dev')}
+        monkeypatch.setattr(system_monitor, 'PROC_STAT', str(paths['stat']))
+        monkeypatch.setattr(system_monitor, 'PROC_MEMINFO', str(paths['meminfo']))
+        monkeypatch.setattr(system_monitor, 'PROC_NET_DEV', str(paths['net_dev']))
+        paths['net_dev'].write_text(self.NET_DEV)
+        return paths
+    
+    def test_fast_collect_linux(self, proc_dir):
+        """測試/proc/stat、/proc/meminfo、/proc/net/dev解析與CPU差值計算"""
+        proc_dir['stat'].write_text(
+            "cpu  100 0 50 800 50 0 0 0 0 0\ncpu0 100 0 50 800 50 0 0 0 0 0\n"
+        )
+        proc_dir['meminfo'].write_text(
+            "MemTotal:        8000000 kB\nMemFree:         1000000 kB\n"
+            "MemAvailable:    6000000 kB\nBuffers:          100000 kB\n"
+        )
+        monitor = system_monitor.SystemMonitor({})
+        
+        # 首次取樣：開機以來的平均 (1000 - 850) / 1000
+        cpu_usage, memory, network = monitor._fast_collect_linux()
+        assert cpu_usage == pytest.approx(15.0)
+        assert memory['total'] == pytest.approx(8000000 * 1024 / 1024**3)
+        assert memory['available'] == pytest.approx(6000000 * 1024 / 1024**3)
+        assert memory['percent'] == pytest.approx(25.0)
+        assert network == {'bytes_sent': 8000, 'bytes_recv': 6000,
+                           'packets_sent': 80, 'packets_recv': 60}
+        
+        # 第二次取樣：以差值計算，total +900、idle +750
+        proc_dir['stat'].write_text("cpu  200 0 100 1500 100 0 0 0 0 0\n")
+        cpu_usage, _, _ = monitor._fast_collect_linux()
+        assert cpu_usage == pytest.approx(150 / 900 * 100)
+        
+        # 無MemAvailable時以MemFree計算
+        proc_dir['meminfo'].write_text("MemTotal: 4000000 kB\nMemFree: 1000000 kB\n")
+        _, memory, _ = monitor._fast_collect_linux()
+        assert memory['percent'] == pytest.approx(75.0)
+    
+    def test_update_thresholds_reevaluates_health(self):
+        """測試更新閾值後立即以新閾值重新評估健康狀態"""
+        thresholds = {'cpu_usage': 80.0, 'memory_usage': 85.0,
+                      'temperature': 70.0, 'disk_usage': 90.0}
+        config = {'system': {'monitoring': {'thresholds': thresholds}}}
+        monitor = system_monitor.SystemMonitor(config)
+        
+        stats = {'timestamp': 't0', 'cpu_usage': 50.0, 'memory': {'percent': 50.0},
+                 'disk': {'percent': 10.0}, 'temperature': None}
+        monitor._check_thresholds(stats, 't0')
+        monitor._update_history(stats)
+        assert monitor.get_system_health()['status'] == 'healthy'
+        
+        monitor.update_thresholds({'cpu_usage': 40.0, 'memory_usage': 40.0})
+        
+        health = monitor.get_system_health()
+        assert health['status'] == 'critical'
+        assert health['score'] == 55
+        assert len(health['issues']) == 2
+        # 呼叫端的配置不受影響
+        assert thresholds['cpu_usage'] == 80.0
+
+
 class TestSystemIntegration:
     """測試系統整合"""
     
-    def test_config_loading(self):
+    def test_config_loading(self, system_config):
         """測試配置載入"""
-        config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'system_params.yaml')
+        config = system_config
         
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            
+        if config is not None:
             # 驗證配置結構
             assert 'hardware' in config
             assert 'vision' in config
             assert 'controller' in config
             assert 'feature_fusion' in config
     
-    def test_end_to_end_processing(self):
-        """測試端到端處理流程"""
-        # 最小配置
-        config = {
-            'vision': {
-                'roi_config': {
-                    'roi_bub': {'x': 100, 'y': 100, 'width': 200, 'height': 150},
-                    'roi_ring': {'x': 50, 'y': 50, 'width': 300, 'height': 250}
-                },
-                'preprocessing': {
-                    'clahe': {'clip_limit': 2.0, 'tile_grid_size': [8, 8]}
-                },
-                'feature_extraction': {
-                    'motion_energy': {'temporal_window': 5, 'threshold': 15},
-                    'ripple_spectral': {'high_freq_start': 0.3, 'low_freq_end': 0.1},
-                    'bubble_pop': {'min_area': 50, 'max_area': 500},
-                    'optical_flow': {'pyramid_levels': 3, 'window_size': 15}
-                }
-            },
-            'feature_fusion': {
-                'weights': {'alpha': 0.4, 'beta': 0.3, 'gamma': 0.2, 'delta': 0.1},
-                'baseline': {'ME0': 10.0, 'RSI0': 0.2},
-                'normalization': {'RSI_max': 2.0, 'POP_max': 10.0, 'FLOW_max': 100.0, 'ME_max': 50.0}
-            },
-            'controller': {
-                'timing': {'t_feed': 0.6, 't_eval': 3.0, 't_settle': 1.0},
-                'thresholds': {'H_hi': 0.65, 'H_lo': 0.35},
-                'pi_controller': {'Kp': 15.0, 'Ki': 2.0},
-                'constraints': {'delta_up': 10.0, 'delta_down': 15.0},
-                'anti_windup': {'enable': True, 'max_integral': 50.0}
-            },
-            'hardware': {'pwm': {'min_duty_cycle': 20, 'max_duty_cycle': 70}},
-            'anomaly_detection': {
-                'fps_threshold': 50,
-                'fallback_mode': {'pwm_safe_value': 30}
-            }
-        }
-        
-        # 創建處理器
-        image_processor = ImageProcessor(config)
-        feature_extractor = FeatureExtractor(config)
-        feeding_controller = FeedingController(config)
+    def test_config_reload_on_older_mtime(self, tmp_path):
+        """測試配置文件換成mtime較舊的版本時仍重新解析"""
+        config_file = tmp_path / 'params.yaml'
+        config_file.write_text('a: 1\n')
+        os.utime(config_file, ns=(2_000_000_000_000_000_000, 2_000_000_000_000_000_000))
+        assert load_yaml_config(str(config_file)) == {'a': 1}
         
+        # 模擬 cp -p / git checkout：內容改變但mtime變舊
+        config_file.write_text('a: 2\n')
+        os.utime(config_file, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+        assert load_yaml_config(str(config_file)) == {'a': 2}
+    
+    def test_end_to_end_processing(self, rand_frame, image_processor,
+                                   feature_extractor, feeding_controller):
+        """測試端到端處理流程"""
         # 模擬完整處理流程
-        test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        test_image = rand_frame
         
         # 1. 影像處理
         processed_image, rois = image_processor.preprocess_image(test_image)
@@ -311,44 +664,30 @@ class TestSystemIntegration:
         assert 20.0 <= pwm <= 70.0
 
 
-def test_performance():
+@pytest.mark.serial
+def test_performance(rand_frame, image_processor, feature_extractor, cv_all_threads):
     """性能測試"""
-    # 簡化配置
-    config = {
-        'vision': {
-            'roi_config': {
-                'roi_bub': {'x': 100, 'y': 100, 'width': 200, 'height': 150},
-                'roi_ring': {'x': 50, 'y': 50, 'width': 300, 'height': 250}
-            },
-            'preprocessing': {'clahe': {'clip_limit': 2.0, 'tile_grid_size': [8, 8]}},
-            'feature_extraction': {
-                'motion_energy': {'temporal_window': 5, 'threshold': 15},
-                'ripple_spectral': {'high_freq_start': 0.3, 'low_freq_end': 0.1},
-                'bubble_pop': {'min_area': 50, 'max_area': 500},
-                'optical_flow': {'pyramid_levels': 3, 'window_size': 15}
-            }
-        },
-        'feature_fusion': {
-            'baseline': {'ME0': 10.0, 'RSI0': 0.2},
-            'normalization': {'RSI_max': 2.0, 'POP_max': 10.0, 'FLOW_max': 100.0, 'ME_max': 50.0}
-        }
-    }
-    
-    # 創建處理器
-    image_processor = ImageProcessor(config)
-    feature_extractor = FeatureExtractor(config)
-    
     # 性能測試
     num_frames = 30
-    test_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    test_image = rand_frame
     
-    start_time = time.time()
+    # 與vision_node相同的逐幀路徑：前處理後將特徵寫入預先配置的特徵向量
+    feat_buf = np.zeros(5, dtype=np.float32)
     
-    for _ in range(num_frames):
-        processed_image, rois = image_processor.preprocess_image(test_image)
-        features = feature_extractor.extract_features(rois)
+    # 量測期間停用GC，避免全域回收停頓干擾取樣
+    gc.collect()
+    gc.disable()
+    start_time = time.perf_counter_ns()
+    
+    try:
+        for _ in range(num_frames):
+            processed_image, rois = image_processor.preprocess_image(test_image)
+            features = feature_extractor.extract_features(rois, out=feat_buf)
+        
+        elapsed_time = (time.perf_counter_ns() - start_time) / 1e9
+    finally:
+        gc.enable()
     
-    elapsed_time = time.time() - start_time
     fps = num_frames / elapsed_time
     
     print(f"處理性能: {fps:.2f} FPS")